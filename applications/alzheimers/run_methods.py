@@ -4,16 +4,15 @@ import pickle
 import re
 import sys
 
-from localgraph import plot_graph, restrict_to_local_graph
+from localgraph import plot_graph
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 
 from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR.parent.parent))
-from methods import run_method, silggm_methods
-from utils import max_cor_response
+from methods import DataContext, run_method, silggm_methods
+from utils import max_cor_response, restrict_to_local_graph
 
 #----------------------------------------------------------------
 # Setup
@@ -64,6 +63,9 @@ X = np.hstack([X_ct, Y])
 feature_names.append('ad_status')
 target_features = [len(feature_names) - 1]
 
+# standardize once; the huge, mgm and SILGGM passes share its cached summaries
+data_context = DataContext(X)
+
 print(f'Cell type: {cell_type}')
 print(f'Samples: {X.shape[0]}')
 print(f'Genes: {X.shape[1]}\n')
@@ -126,14 +128,13 @@ for method_name in methods_to_run:
 	# huge methods
 	#----------------------------------------------------------------
 	if method_name in huge_methods:
-		X = StandardScaler().fit_transform(X)
 		if max_cor_lambda:
-			max_cors = max_cor_response(X, target_features)
+			max_cors = max_cor_response(data_context, target_features)
 			lambda_ = 0.99 * min(max_cors)
 		else:
 			lambda_ = None
 		method_args = {'lambda_': lambda_, 'apply_npn': apply_npn}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		A = result['adjacency_matrix']
 		if max_radius is not None:
 			result['adjacency_matrix'] = restrict_to_local_graph(
@@ -146,9 +147,8 @@ for method_name in methods_to_run:
 	# Mixed graphical model
 	#----------------------------------------------------------------
 	if method_name == 'mgm':
-		X = StandardScaler().fit_transform(X)
 		method_args = {'cat_threshold': 4}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		A = result['adjacency_matrix']
 		if max_radius is not None:
 			result['adjacency_matrix'] = restrict_to_local_graph(
@@ -161,9 +161,8 @@ for method_name in methods_to_run:
 	# SILGGM
 	#----------------------------------------------------------------
 	if method_name in silggm_methods:
-		X = StandardScaler().fit_transform(X)
 		method_args = {'alpha': target_fdrs, 'apply_npn': apply_npn}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		adjacency_matrix = result['adjacency_matrix']
 
 		if max_radius is not None:
@@ -27,7 +27,15 @@ save_result = False
 show_result = True
 
 random_seed = 6261928
-np.random.seed(random_seed)
+# pfs draws from the global numpy state (localgraph takes no Generator). With use_rng_streams,
+# SeedSequence(random_seed) is spawned into a data stream and a pfs stream and the global state
+# is seeded from the pfs stream, as in simulations/trials.py; False reproduces the published results
+use_rng_streams = False
+if use_rng_streams:
+	_, pfs_seq = np.random.SeedSequence(random_seed).spawn(2) # no data randomness here; the first stream is unused
+	np.random.seed(np.random.default_rng(pfs_seq).integers(2**32))
+else:
+	np.random.seed(random_seed)
 
 # cell types: astro, doublet, endo, mg, neuron, oligo, OPC, unID 
 cell_type = 'astro'
@@ -122,6 +130,7 @@ if save_result:
 	result = {
 		'cell_type': cell_type,
 		'random_seed': random_seed,
+		'use_rng_streams': use_rng_streams,
 		'radius': radius,
 		'qpath_max': qpath_max,
 		'fdr_local': fdr_local,
@@ -143,12 +143,9 @@ def load_and_clean(
 	# remove highly correlated columns
 	if X.shape[1] > 1:
 		correlation_matrix = np.corrcoef(X, rowvar=False)
-		correlated_columns = set()
-		for i in range(len(correlation_matrix)):
-			for j in range(i + 1, len(correlation_matrix)):
-				if abs(correlation_matrix[i, j]) > correlation_threshold:
-					correlated_columns.add(j)
-		uncorrelated_columns = [i for i in range(X.shape[1]) if i not in correlated_columns]
+		# drop column j if it is highly correlated with any earlier column i < j
+		correlated = np.triu(np.abs(correlation_matrix) > correlation_threshold, k=1).any(axis=0)
+		uncorrelated_columns = np.flatnonzero(~correlated).tolist()
 		X = X[:, uncorrelated_columns]
 		feature_names = [feature_names[i] for i in uncorrelated_columns]
 		if verbose:
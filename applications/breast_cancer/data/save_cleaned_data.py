@@ -1,9 +1,14 @@
 # Save the cleaned data using the load_and_clean function from load_and_clean.py
 
 import os
+import pickle
+import sys
 import pandas as pd
 from load_and_clean import load_and_clean
 
+sys.path.insert(0, os.path.abspath('../../..'))
+from methods.schema import infer_schema
+
 # Define settings
 feature_types = ['rnaseq', 'mirna', 'rppa']
 responses = [('clinical', 'status'), ('clinical', 'histological_type'), ('clinical', 'pathologic_stage')]
@@ -30,4 +35,10 @@ print(df.shape)
 os.makedirs('./cleaned_data', exist_ok=True)
 df.to_csv('./cleaned_data/cleaned_data_var75.csv', index=False)
 
+# column schema (types, levels, constancy) for run_mgm, saved next to the data under the
+# name run_methods.py looks up for cleaned_data.csv (<data stem>_schema.pkl)
+schema = infer_schema(df.to_numpy(dtype=float), columns=df.columns)
+with open('./cleaned_data/cleaned_data_schema.pkl', 'wb') as f:
+	pickle.dump(schema, f)
+
 
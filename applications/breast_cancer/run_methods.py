@@ -7,16 +7,16 @@
 import pickle
 import sys
 
-from localgraph import plot_graph, restrict_to_local_graph
+from localgraph import plot_graph
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 
 from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR.parent.parent))
-from methods import run_method
-from utils import max_cor_response
+from methods import DataContext, run_method
+from methods.schema import select_columns
+from utils import max_cor_response, restrict_to_local_graph
 
 #----------------------------------------------------------------
 # Setup
@@ -67,6 +67,16 @@ X_raw = df.to_numpy()
 target_names = ['histological_type', 'pathologic_stage', 'status']
 target_features = [df.columns.get_loc(name) for name in target_names]
 
+# standardize once; the huge, mgm and SILGGM passes share its cached summaries
+data_context = DataContext(X_raw)
+
+# column schema saved with the cleaned data; if missing, mgm infers it once from data_context
+schema_path = data_path.with_name(f'{data_path.stem}_schema.pkl')
+schema = None
+if schema_path.exists():
+	with open(schema_path, 'rb') as f:
+		schema = select_columns(pickle.load(f), feature_names)
+
 #----------------------------------------------------------------
 # Loop through methods
 #----------------------------------------------------------------
@@ -125,14 +135,13 @@ for method_name in methods_to_run:
 	# huge
 	#----------------------------------------------------------------
 	if method_name in huge_methods:
-		X = StandardScaler().fit_transform(X)
 		if max_cor_lambda:
-			max_cors = max_cor_response(X, target_features)
+			max_cors = max_cor_response(data_context, target_features)
 			lambda_ = 0.99 * min(max_cors)
 		else:
 			lambda_ = None
 		method_args = {'lambda_':lambda_, 'apply_npn':apply_npn}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		A = result['adjacency_matrix']
 		if max_radius is not None:
 			result['adjacency_matrix'] = restrict_to_local_graph(A, target_features, max_radius)
@@ -144,9 +153,8 @@ for method_name in methods_to_run:
 	# Mixed graphical models (mgm)
 	#----------------------------------------------------------------
 	if method_name == 'mgm':
-		X = StandardScaler().fit_transform(X)
-		method_args = {'cat_threshold':4}
-		result = run_method(method_name, X, **method_args)
+		method_args = {'cat_threshold':4, 'schema':schema}
+		result = run_method(method_name, data_context, **method_args)
 		A = result['adjacency_matrix']
 		if max_radius is not None:
 			result['adjacency_matrix'] = restrict_to_local_graph(A, target_features, max_radius)
@@ -158,9 +166,8 @@ for method_name in methods_to_run:
 	# SILGGM
 	#----------------------------------------------------------------
 	if method_name in silggm_methods:
-		X = StandardScaler().fit_transform(X)
 		method_args = {'alpha': target_fdrs, 'apply_npn': apply_npn}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		adjacency_matrix = result['adjacency_matrix']
 		if max_radius is not None:
 			if len(target_fdrs) == 1:
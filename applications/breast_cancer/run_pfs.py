@@ -24,6 +24,10 @@ save_result = False
 show_result = True
 
 random_seed_list = [11201959]
+# pfs draws from the global numpy state (localgraph takes no Generator). With use_rng_streams,
+# SeedSequence(seed) is spawned into a data stream and a pfs stream and the global state
+# is seeded from the pfs stream of each seed, as in simulations/trials.py; False reproduces the published results
+use_rng_streams = False
 
 #--------------------------------
 # Load data
@@ -55,14 +59,17 @@ custom_nbhd = {}
 #--------------------------------
 result = {
 	'random_seed_list': random_seed_list,
+	'use_rng_streams': use_rng_streams,
 	'qpath_max': qpath_max,
 	'fdr_local': fdr_local,
 	'custom_nbhd': custom_nbhd
 }
 
-# Add small noise to discrete targets
+# Add small noise to discrete targets (from the data stream of the first seed with use_rng_streams)
+streams = {seed: np.random.SeedSequence(seed).spawn(2) for seed in random_seed_list}
+noise = np.random.default_rng(streams[random_seed_list[0]][0]) if use_rng_streams else np.random
 for idx in target_features:
-	X[:, idx] += np.random.normal(0, 0.01, size=X.shape[0])
+	X[:, idx] += noise.normal(0, 0.01, size=X.shape[0])
 
 n, p = X.shape
 result.update({
@@ -79,7 +86,7 @@ ipss_args = {'B': 200, 'preselector_args': {'expansion_factor': 2.5}}
 
 for random_seed in random_seed_list:
 
-	np.random.seed(random_seed)
+	np.random.seed(np.random.default_rng(streams[random_seed][1]).integers(2**32) if use_rng_streams else random_seed)
 
 	print(f'Random seed: {random_seed}')
 	print(f'--------------------------------')
@@ -1,9 +1,13 @@
 # Functions for loading county-level environmental, socioeconomic, demographic, and health data
 
 import os
+import sys
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from methods.schema import infer_schema
+
 def load_and_clean(
 	data_dir,
 	data_name='eqi2000.csv',
@@ -14,7 +18,8 @@ def load_and_clean(
 	n_redundant=None,
 	remove_nan=True,
 	states_to_remove=None,
-	verbose=False
+	verbose=False,
+	rng=None
 ):
 	if responses is None:
 		raise ValueError("Please specify the response variables.")
@@ -40,10 +45,9 @@ def load_and_clean(
 
 	# Drop redundant features with very low variation
 	if n_redundant is not None:
-		redundant = [
-			col for col in df.drop(columns=responses)
-			if df[col].value_counts(dropna=False).max() > n_redundant
-		]
+		covariates = df.drop(columns=responses)
+		schema = infer_schema(covariates.to_numpy(dtype=float), columns=covariates.columns)
+		redundant = covariates.columns[schema['max_count'] > n_redundant].tolist()
 		if verbose and redundant:
 			print(f" - {len(redundant)} redundant features dropped (>{n_redundant} identical values).")
 		features_to_drop.extend(redundant)
@@ -107,10 +111,11 @@ def preprocess_eqi_df(df, responses, states_to_remove):
 	# Drop rows that are all NaN
 	df.dropna(how='all', inplace=True)
 
-	# Add jitter to certain categorical-like features
+	# Add jitter to certain categorical-like features (from rng if given, else the global numpy state)
+	random = np.random if rng is None else rng
 	for noisy_col in ['RadonZone', 'cat_RUCC']:
 		if noisy_col in df.columns:
-			df[noisy_col] += np.random.normal(0, 0.05, size=df.shape[0])
+			df[noisy_col] += random.normal(0, 0.05, size=df.shape[0])
 
 	df.set_index('FIPS', inplace=True)
 	return df
@@ -118,13 +123,11 @@ def preprocess_eqi_df(df, responses, states_to_remove):
 def identify_constant_features(df, state_col='State', states_to_remove=None):
 	constant_features = {}
 	feature_cols = [col for col in df.columns if col not in ['FIPS', state_col, 'County_Name']]
+	skipped_states = ['DC'] + list(states_to_remove or [])
+	# number of distinct values of every feature within every state, in one groupby pass
+	is_constant = df[~df[state_col].isin(skipped_states)].groupby(state_col)[feature_cols].nunique() == 1
 	for feat in feature_cols:
-		constant_states = []
-		for state, group in df.groupby(state_col):
-			if state == 'DC' or (states_to_remove and state in states_to_remove):
-				continue
-			if group[feat].nunique() == 1:
-				constant_states.append(state)
+		constant_states = is_constant.index[is_constant[feat]].tolist()
 		if constant_states:
 			constant_features[feat] = (constant_states, len(constant_states))
 	return constant_features
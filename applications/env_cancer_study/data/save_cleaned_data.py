@@ -3,8 +3,10 @@
 import numpy as np
 import pandas as pd
 import os
+import pickle
 
 from load_and_clean import load_and_clean
+from methods.schema import infer_schema
 
 random_seed = 4161932
 np.random.seed(random_seed)
@@ -59,3 +61,8 @@ full_columns = feature_names
 
 df_full = pd.DataFrame(full_data, columns=full_columns)
 df_full.to_csv(os.path.join(out_dir, 'cleaned_data.csv'), index=False)
+
+# column schema (types, levels, constancy) for run_mgm, saved next to the data
+schema = infer_schema(full_data, columns=full_columns)
+with open(os.path.join(out_dir, 'cleaned_data_schema.pkl'), 'wb') as f:
+	pickle.dump(schema, f)
@@ -25,7 +25,15 @@ save_result = False
 show_result = True
 
 random_seed = 4161932
-np.random.seed(random_seed)
+# pfs draws from the global numpy state (localgraph takes no Generator). With use_rng_streams,
+# SeedSequence(random_seed) is spawned into a data stream and a pfs stream and the global state
+# is seeded from the pfs stream, as in simulations/trials.py; False reproduces the published results
+use_rng_streams = False
+if use_rng_streams:
+	_, pfs_seq = np.random.SeedSequence(random_seed).spawn(2) # no data randomness here; the first stream is unused
+	np.random.seed(np.random.default_rng(pfs_seq).integers(2**32))
+else:
+	np.random.seed(random_seed)
 
 # Graph details
 radius = 1
@@ -72,6 +80,7 @@ result = {'random_seed':random_seed, 'response_names':['Mortality',  'Incidence'
 # add metadata
 result['X_shape'] = X.shape
 result['custom_nbhd'] = custom_nbhd
+result['use_rng_streams'] = use_rng_streams
 result['fdr_local'] = fdr_local
 result['radius'] = radius
 
@@ -8,16 +8,15 @@ import pickle
 import re
 import sys
 
-from localgraph import plot_graph, restrict_to_local_graph
+from localgraph import plot_graph
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 
 from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR.parent.parent))
-from methods import run_method, method_type, bnlearn_methods, bnlearn_local_methods, huge_methods, silggm_methods
-from utils import max_cor_response
+from methods import DataContext, run_method, method_type, bnlearn_methods, bnlearn_local_methods, huge_methods, silggm_methods
+from utils import max_cor_response, restrict_to_local_graph
 
 #----------------------------------------------------------------
 # Setup
@@ -35,6 +34,8 @@ max_radius = 3
 target_fdrs = [0.05]
 bnlearn_fdr = 0.05
 bnlearn_local_fdr = 0.025
+n_workers = 1 # R worker processes for the layers of local bnlearn methods
+local_cache = None # memoize local bnlearn queries on disk (True, a directory, or None); cached nodes are left out of runtime
 
 #----------------------------------------------------------------
 # Load data
@@ -49,6 +50,9 @@ age_adjusted = data['age_adjusted']
 n = data['n']
 p = data['p']
 
+# standardize once; the huge, mgm and SILGGM passes share its cached summaries
+data_context = DataContext(X)
+
 #----------------------------------------------------------------
 # Loop through methods
 #----------------------------------------------------------------
@@ -91,17 +95,17 @@ for method_name in methods_to_run:
 		verbose = True
 		bnlearn_local_methods = {
 			'fast_iamb_local': {'alpha':bnlearn_local_fdr, 'test':bnlearn_test, 'target_features':target_features, 
-				'radius':max_radius, 'verbose':verbose},
+				'radius':max_radius, 'verbose':verbose, 'n_workers':n_workers, 'cache':local_cache},
 			'hpc_local': {'alpha':bnlearn_local_fdr, 'test':bnlearn_test, 'target_features':target_features, 
-				'radius':max_radius, 'verbose':verbose},
+				'radius':max_radius, 'verbose':verbose, 'n_workers':n_workers, 'cache':local_cache},
 			'iamb_local': {'alpha':bnlearn_local_fdr, 'test':bnlearn_test, 'target_features':target_features, 
-				'radius':max_radius, 'verbose':verbose},
+				'radius':max_radius, 'verbose':verbose, 'n_workers':n_workers, 'cache':local_cache},
 			'mmpc_local': {'alpha':bnlearn_local_fdr, 'test':bnlearn_test, 'target_features':target_features, 
-				'radius':max_radius, 'verbose':verbose},
+				'radius':max_radius, 'verbose':verbose, 'n_workers':n_workers, 'cache':local_cache},
 			'pc_stable_local': {'alpha':bnlearn_local_fdr, 'test':bnlearn_test, 'target_features':target_features, 
-				'radius':max_radius, 'verbose':verbose},
+				'radius':max_radius, 'verbose':verbose, 'n_workers':n_workers, 'cache':local_cache},
 			'si_hiton_pc_local': {'alpha':bnlearn_local_fdr, 'test':bnlearn_test, 'target_features':target_features, 
-				'radius':max_radius, 'verbose':verbose}
+				'radius':max_radius, 'verbose':verbose, 'n_workers':n_workers, 'cache':local_cache}
 		}
 
 		method_args = bnlearn_local_methods[method_name]
@@ -113,19 +117,20 @@ for method_name in methods_to_run:
 			)
 		runtime = result['runtime']
 		print(f'Runtime: {runtime:.2f} seconds')
+		if result.get('cached'):
+			print(f' - {result["cache_hits"]} nodes loaded from cache; their cost is not included in the runtime')
 
 	#----------------------------------------------------------------
 	# huge methods
 	#----------------------------------------------------------------
 	if mtype == 'huge':
-		X = StandardScaler().fit_transform(X)
 		if max_cor_lambda:
-			max_cors = max_cor_response(X, target_features)
+			max_cors = max_cor_response(data_context, target_features)
 			lambda_ = 0.99 * min(max_cors)
 		else:
 			lambda_ = None
 		method_args = {'lambda_': lambda_, 'apply_npn': apply_npn}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		A = result['adjacency_matrix']
 		if max_radius is not None:
 			result['adjacency_matrix'] = restrict_to_local_graph(
@@ -138,9 +143,8 @@ for method_name in methods_to_run:
 	# SILGGM
 	#----------------------------------------------------------------
 	if mtype == 'silggm':
-		X = StandardScaler().fit_transform(X)
 		method_args = {'alpha': target_fdrs, 'apply_npn': apply_npn}
-		result = run_method(method_name, X, **method_args)
+		result = run_method(method_name, data_context, **method_args)
 		adjacency_matrix = result['adjacency_matrix']
 
 		if max_radius is not None:
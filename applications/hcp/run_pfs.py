@@ -6,7 +6,6 @@
 - Purpose: estimate local dependency structure around cognition using PFS
 """
 
-from collections import defaultdict
 import pickle
 import sys
 import time
@@ -17,6 +16,7 @@ import numpy as np
 from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR.parent.parent))
+from methods import EdgeTable
 
 #--------------------------------
 # Setup
@@ -25,7 +25,15 @@ save_result = False
 show_result = True
 
 random_seed = 1
-np.random.seed(random_seed)
+# pfs draws from the global numpy state (localgraph takes no Generator). With use_rng_streams,
+# SeedSequence(random_seed) is spawned into a data stream and a pfs stream and the global state
+# is seeded from the pfs stream, as in simulations/trials.py; False reproduces the published results
+use_rng_streams = False
+if use_rng_streams:
+	_, pfs_seq = np.random.SeedSequence(random_seed).spawn(2) # no data randomness here; the first stream is unused
+	np.random.seed(np.random.default_rng(pfs_seq).integers(2**32))
+else:
+	np.random.seed(random_seed)
 
 #----------------------------------------------------------------
 # Load data
@@ -57,6 +65,7 @@ ipss_args = {'B':100}
 #----------------------------------------------------------------
 result = {
 	'random_seed': random_seed,
+	'use_rng_streams': use_rng_streams,
 	'age_adjusted': age_adjusted,
 	'qpath_max': qpath_max,
 	'fdr_local': fdr_local,
@@ -91,37 +100,33 @@ result['Q'] = Q
 #----------------------------------------------------------------
 def print_nodes_by_radius(Q, target_features, feature_names, max_radius):
 
-	adj = defaultdict(set)
-	for (i, j) in Q.keys():
-		adj[i].add(j)
-		adj[j].add(i)
+	table = EdgeTable.from_dict(Q, len(feature_names))
 
 	for t in target_features:
 		print(f'\nTarget: {feature_names[t]}')
 		print('-' * 40)
 
-		visited = {t}
-		frontier = {t}
+		visited = np.zeros(table.p, dtype=bool)
+		visited[t] = True
+		frontier = np.array([t])
 
 		for r in range(1, max_radius + 1):
-			next_frontier = set()
-			for u in frontier:
-				next_frontier |= adj[u]
-
-			next_frontier -= visited
-			visited |= next_frontier
-
-			if not next_frontier:
+			# edges from the frontier to unvisited nodes; each new node gets its smallest q
+			_, v, q = table.incident(frontier)
+			new = ~visited[v]
+			v, q = v[new], q[new]
+			next_frontier = np.unique(v)
+			visited[next_frontier] = True
+
+			if next_frontier.size == 0:
 				break
 
+			best_q = np.full(table.p, np.inf)
+			np.minimum.at(best_q, v, q)
+
 			print(f'Radius {r}:')
-			for v in sorted(next_frontier):
-				q = min(
-					Q.get((u, v), np.inf)
-					for u in frontier
-					if (u, v) in Q or (v, u) in Q
-				)
-				print(f'  {feature_names[v]} (q = {q:.3f})')
+			for node in next_frontier:
+				print(f'  {feature_names[node]} (q = {best_q[node]:.3f})')
 
 			frontier = next_frontier
 
@@ -1,52 +1,92 @@
 # Main function for running different graph estimation methods
+"""
+Backends are resolved lazily: importing this package does not start R. Embedded R and the
+R package of a method family (huge, SILGGM, mgm, bnlearn) are only loaded the first time a
+method from that family runs, so scripts that only need the metadata stay lightweight.
+The *_numpy methods are NumPy versions of the huge methods and never start R.
+"""
 
+from importlib import import_module
+
+from .adjacency import SparseAdjacency
+from .data_context import DataContext
+from .edge_table import EdgeTable
 from .metadata import *
-from .run_bnlearn import run_bnlearn, run_bnlearn_local
-from .run_huge import run_huge
-from .run_mgm import run_mgm
-from .run_silggm import run_silggm
+from .pool import MethodPool
+
+# load a backend module on first call
+def _lazy(module_name, function_name):
+	def backend(X, **kwargs):
+		module = import_module(f'.{module_name}', __name__)
+		return getattr(module, function_name)(X, **kwargs)
+	backend.__name__ = function_name
+	return backend
+
+# the proxies are private: importing a submodule (run_huge, ...) binds its name on this package,
+# so a proxy of the same name would be replaced by the module. Import the backend functions
+# from their submodules instead, e.g. from methods.run_huge import run_huge
+_run_bnlearn = _lazy('run_bnlearn', 'run_bnlearn')
+_run_bnlearn_local = _lazy('run_bnlearn', 'run_bnlearn_local')
+_run_huge = _lazy('run_huge', 'run_huge')
+_run_mgm = _lazy('run_mgm', 'run_mgm')
+_run_nodewise = _lazy('run_nodewise', 'run_nodewise')
+_run_silggm = _lazy('run_silggm', 'run_silggm')
+
+# R data handles import rpy2, so they are also resolved on first access
+def __getattr__(name):
+	if name in ('RData', 'get_r_data'):
+		return getattr(import_module('.r_data', __name__), name)
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 all_methods = {
 	# SILGGM
-	'bnwsl':  lambda X, **kw: run_silggm(X, method='B_NW_SL', **kw),
-	'dsgl':   lambda X, **kw: run_silggm(X, method='D-S_GL', **kw),
-	'dsnwsl': lambda X, **kw: run_silggm(X, method='D-S_NW_SL', **kw),
-	'gfcl':   lambda X, **kw: run_silggm(X, method='GFC_L', **kw),
-	'gfcsl':  lambda X, **kw: run_silggm(X, method='GFC_SL', **kw),
+	'bnwsl':  lambda X, **kw: _run_silggm(X, method='B_NW_SL', **kw),
+	'dsgl':   lambda X, **kw: _run_silggm(X, method='D-S_GL', **kw),
+	'dsnwsl': lambda X, **kw: _run_silggm(X, method='D-S_NW_SL', **kw),
+	'gfcl':   lambda X, **kw: _run_silggm(X, method='GFC_L', **kw),
+	'gfcsl':  lambda X, **kw: _run_silggm(X, method='GFC_SL', **kw),
 
 	# huge
-	'glasso': lambda X, **kw: run_huge(X, method='glasso', **kw),
-	'mb':     lambda X, **kw: run_huge(X, method='mb', **kw),
+	'glasso': lambda X, **kw: _run_huge(X, method='glasso', **kw),
+	'mb':     lambda X, **kw: _run_huge(X, method='mb', **kw),
+
+	# huge methods in NumPy (no R)
+	'glasso_numpy': lambda X, **kw: _run_nodewise(X, method='glasso', **kw),
+	'mb_numpy':     lambda X, **kw: _run_nodewise(X, method='mb', **kw),
 
 	# mgm
-	'mgm': run_mgm,
+	'mgm': _run_mgm,
 
 	# bnlearn (global)
-	'aracne':      lambda X, **kw: run_bnlearn(X, method='aracne', **kw),
-	'fast_iamb':   lambda X, **kw: run_bnlearn(X, method='fast.iamb', **kw),
-	'gs':          lambda X, **kw: run_bnlearn(X, method='gs', **kw),
-	'hpc':         lambda X, **kw: run_bnlearn(X, method='hpc', **kw),
-	'iamb':        lambda X, **kw: run_bnlearn(X, method='iamb', **kw),
-	'iamb_fdr':    lambda X, **kw: run_bnlearn(X, method='iamb.fdr', **kw),
-	'inter_iamb':  lambda X, **kw: run_bnlearn(X, method='inter.iamb', **kw),
-	'mmpc':        lambda X, **kw: run_bnlearn(X, method='mmpc', **kw),
-	'pc_stable':   lambda X, **kw: run_bnlearn(X, method='pc.stable', **kw),
-	'si_hiton_pc': lambda X, **kw: run_bnlearn(X, method='si.hiton.pc', **kw),
+	'aracne':      lambda X, **kw: _run_bnlearn(X, method='aracne', **kw),
+	'fast_iamb':   lambda X, **kw: _run_bnlearn(X, method='fast.iamb', **kw),
+	'gs':          lambda X, **kw: _run_bnlearn(X, method='gs', **kw),
+	'hpc':         lambda X, **kw: _run_bnlearn(X, method='hpc', **kw),
+	'iamb':        lambda X, **kw: _run_bnlearn(X, method='iamb', **kw),
+	'iamb_fdr':    lambda X, **kw: _run_bnlearn(X, method='iamb.fdr', **kw),
+	'inter_iamb':  lambda X, **kw: _run_bnlearn(X, method='inter.iamb', **kw),
+	'mmpc':        lambda X, **kw: _run_bnlearn(X, method='mmpc', **kw),
+	'pc_stable':   lambda X, **kw: _run_bnlearn(X, method='pc.stable', **kw),
+	'si_hiton_pc': lambda X, **kw: _run_bnlearn(X, method='si.hiton.pc', **kw),
 
 	# bnlearn (local)
-	'fast_iamb_local':   lambda X, **kw: run_bnlearn_local(X, method='fast.iamb', **kw),
-	'gs_local':          lambda X, **kw: run_bnlearn_local(X, method='gs', **kw),
-	'hpc_local':         lambda X, **kw: run_bnlearn_local(X, method='hpc', **kw),
-	'iamb_local':        lambda X, **kw: run_bnlearn_local(X, method='iamb', **kw),
-	'iamb_fdr_local':    lambda X, **kw: run_bnlearn_local(X, method='iamb.fdr', **kw),
-	'inter_iamb_local':  lambda X, **kw: run_bnlearn_local(X, method='inter.iamb', **kw),
-	'mmpc_local':        lambda X, **kw: run_bnlearn_local(X, method='mmpc', **kw),
-	'pc_stable_local':   lambda X, **kw: run_bnlearn_local(X, method='pc.stable', **kw),
-	'si_hiton_pc_local': lambda X, **kw: run_bnlearn_local(X, method='si.hiton.pc', **kw),
+	'fast_iamb_local':   lambda X, **kw: _run_bnlearn_local(X, method='fast.iamb', **kw),
+	'gs_local':          lambda X, **kw: _run_bnlearn_local(X, method='gs', **kw),
+	'hpc_local':         lambda X, **kw: _run_bnlearn_local(X, method='hpc', **kw),
+	'iamb_local':        lambda X, **kw: _run_bnlearn_local(X, method='iamb', **kw),
+	'iamb_fdr_local':    lambda X, **kw: _run_bnlearn_local(X, method='iamb.fdr', **kw),
+	'inter_iamb_local':  lambda X, **kw: _run_bnlearn_local(X, method='inter.iamb', **kw),
+	'mmpc_local':        lambda X, **kw: _run_bnlearn_local(X, method='mmpc', **kw),
+	'pc_stable_local':   lambda X, **kw: _run_bnlearn_local(X, method='pc.stable', **kw),
+	'si_hiton_pc_local': lambda X, **kw: _run_bnlearn_local(X, method='si.hiton.pc', **kw),
 }
 
 
-def run_method(method_name, X, **kwargs):
+def run_method(method_name, X, budget_seconds=None, **kwargs):
 	if method_name not in all_methods:
 		raise ValueError(f'Unsupported method: {method_name}')
+	# run in a killable worker that is stopped once the wall-clock budget is spent
+	if budget_seconds is not None:
+		from .budget import run_with_budget
+		return run_with_budget(method_name, X, budget_seconds, **kwargs)
 	return all_methods[method_name](X, **kwargs)
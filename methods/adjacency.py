@@ -0,0 +1,106 @@
+# Sparse adjacency matrices returned by the method wrappers
+"""
+Estimated graphs usually have a few hundred edges, but a dense p x p integer adjacency
+matrix takes about 512 MB at p = 8000 and was pickled as such into results/*.pkl. The
+wrappers now return a SparseAdjacency, which stores the graph as a binary scipy CSR matrix.
+Code written for numpy arrays keeps working: numpy functions convert it through __array__,
+and indexing, comparisons and other array attributes fall back to a lazily built dense view.
+utils.restrict_to_local_graph and utils.tp_and_fp work on the sparse form directly.
+"""
+
+import numpy as np
+from scipy import sparse
+
+class SparseAdjacency:
+	"""
+	Binary adjacency matrix stored in CSR form, with a lazy dense view.
+
+	Parameters
+	--------------------------------
+	matrix : array_like or scipy.sparse matrix
+		Adjacency matrix of shape (p, p); every nonzero entry is an edge.
+	"""
+	def __init__(self, matrix):
+		csr = sparse.csr_matrix(matrix)
+		csr.eliminate_zeros()
+		csr.data = np.ones_like(csr.data, dtype=np.int8)
+		csr.sort_indices()
+		self.csr = csr
+		self._dense = None
+
+	@classmethod
+	def from_edges(cls, rows, cols, p, symmetric=True):
+		"""Build from arrays of edge endpoints; with symmetric=True every edge is added in both directions."""
+		rows = np.asarray(rows, dtype=np.int64)
+		cols = np.asarray(cols, dtype=np.int64)
+		if symmetric:
+			rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+		data = np.ones(rows.size, dtype=np.int8)
+		# duplicate edges are summed by scipy; SparseAdjacency resets them to 1
+		return cls(sparse.coo_matrix((data, (rows, cols)), shape=(p, p)))
+
+	@property
+	def shape(self):
+		return self.csr.shape
+
+	@property
+	def nnz(self):
+		return self.csr.nnz
+
+	@property
+	def T(self):
+		return SparseAdjacency(self.csr.T)
+
+	@property
+	def dense(self):
+		"""Dense integer view, built on first access and then cached."""
+		if self._dense is None:
+			self._dense = self.csr.toarray().astype(int)
+		return self._dense
+
+	def toarray(self):
+		return self.dense.copy()
+
+	def edges(self, upper=True):
+		"""Edge endpoints (rows, cols); with upper=True each undirected edge is listed once with row < col."""
+		coo = self.csr.tocoo()
+		rows, cols = coo.row, coo.col
+		if upper:
+			keep = rows < cols
+			rows, cols = rows[keep], cols[keep]
+		return rows, cols
+
+	def neighbors(self, i):
+		return self.csr.indices[self.csr.indptr[i]:self.csr.indptr[i + 1]]
+
+	def __array__(self, dtype=None, copy=None):
+		return self.dense if dtype is None else self.dense.astype(dtype)
+
+	def __getitem__(self, key):
+		return self.dense[key]
+
+	def __len__(self):
+		return self.shape[0]
+
+	def __eq__(self, other):
+		return self.dense == np.asarray(other)
+
+	def __ne__(self, other):
+		return self.dense != np.asarray(other)
+
+	# remaining ndarray attributes (astype, sum, ndim, ...) come from the dense view
+	def __getattr__(self, name):
+		if name.startswith('_') or name == 'csr':
+			raise AttributeError(name)
+		return getattr(self.dense, name)
+
+	# pickle only the sparse form
+	def __getstate__(self):
+		return {'csr': self.csr}
+
+	def __setstate__(self, state):
+		self.csr = state['csr']
+		self._dense = None
+
+	def __repr__(self):
+		return f'SparseAdjacency(p={self.shape[0]}, edges={self.nnz // 2})'
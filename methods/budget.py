@@ -0,0 +1,81 @@
+# Wall-clock budgets for comparison methods
+"""
+A running R call cannot be interrupted from Python. run_with_budget therefore runs the
+method in a separate spawned process and terminates that process if the budget expires,
+returning a result with timed_out=True instead of blocking the caller. The budget starts
+once the worker process has started and imported methods, so process start-up is not
+counted, but the start-up of the R session and the loading of R packages happen inside the
+method call and count against the budget. A timed-out run reports the budget as its runtime.
+"""
+
+import multiprocessing
+
+def _run_method(conn, method_name, X, kwargs):
+	try:
+		from methods import run_method
+		conn.send(('ready', None))
+		conn.send(('ok', run_method(method_name, X, **kwargs)))
+	except Exception as e:
+		# R errors are not always picklable
+		try:
+			conn.send(('error', e))
+		except Exception:
+			conn.send(('error', RuntimeError(repr(e))))
+	finally:
+		conn.close()
+
+def run_with_budget(method_name, X, budget_seconds, **kwargs):
+	"""
+	Run run_method(method_name, X, **kwargs) in a killable worker process.
+
+	Parameters
+	--------------------------------
+	method_name : str
+		Name of the method in all_methods.
+	X : numpy.ndarray or RData
+		Data matrix of shape (n, p).
+	budget_seconds : float
+		Wall-clock budget in seconds.
+
+	Returns
+	--------------------------------
+	result : dict
+		The usual result of the method with timed_out=False, or, if the budget expired,
+		{'adjacency_matrix': None, 'runtime': budget_seconds, 'timed_out': True, 'budget_seconds': budget_seconds}.
+	"""
+	ctx = multiprocessing.get_context('spawn')
+	receiver, sender = ctx.Pipe(duplex=False)
+	process = ctx.Process(target=_run_method, args=(sender, method_name, X, kwargs))
+
+	process.start()
+	sender.close()
+
+	def receive():
+		try:
+			status, value = receiver.recv()
+		except EOFError:
+			process.join()
+			raise RuntimeError(f'{method_name} worker exited with code {process.exitcode}')
+		if status == 'error':
+			process.join()
+			raise value
+		return value
+
+	try:
+		# the budget starts when the worker is ready to call the method
+		receive()
+		if receiver.poll(budget_seconds):
+			value = receive()
+			process.join()
+			value['timed_out'] = False
+			return value
+	finally:
+		if process.is_alive():
+			process.terminate()
+			process.join(5)
+			if process.is_alive():
+				process.kill()
+				process.join()
+		receiver.close()
+
+	return {'adjacency_matrix':None, 'runtime':budget_seconds, 'timed_out':True, 'budget_seconds':budget_seconds}
@@ -0,0 +1,99 @@
+# On-disk memo cache for local neighborhood queries
+"""
+The learn.mb/learn.nbr result for a node depends only on the data, the method, its
+arguments and the node, yet it used to be recomputed for every radius, every target set
+and every re-run of a script. DiskCache stores such results as small pickle files keyed
+by a hash of these inputs. The total size of the cache directory is bounded; when it is
+exceeded, the least recently used entries are evicted.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+default_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'localgraph-paper', 'local_queries')
+
+def fingerprint(X):
+	"""Content hash of an array, including its shape and dtype."""
+	X = np.ascontiguousarray(X)
+	h = hashlib.blake2b(digest_size=16)
+	h.update(f'{X.shape}{X.dtype.str}'.encode())
+	h.update(X.data)
+	return h.hexdigest()
+
+class DiskCache:
+	"""
+	Size-bounded on-disk key-value cache with least-recently-used eviction.
+
+	Parameters
+	--------------------------------
+	cache_dir : str, optional
+		Directory holding the cache entries. Defaults to ~/.cache/localgraph-paper/local_queries.
+	max_bytes : int
+		Maximum total size of the cache entries in bytes.
+	"""
+	def __init__(self, cache_dir=None, max_bytes=2**30):
+		self.cache_dir = default_cache_dir if cache_dir is None else cache_dir
+		self.max_bytes = max_bytes
+		os.makedirs(self.cache_dir, exist_ok=True)
+		self._size = sum(entry.stat().st_size for entry in self._entries())
+
+	@staticmethod
+	def key(*parts):
+		"""Hash a tuple of picklable, deterministically ordered parts into a cache key."""
+		return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+	def get(self, key, default=None):
+		path = self._path(key)
+		try:
+			with open(path, 'rb') as f:
+				value = pickle.load(f)
+		except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+			return default
+		# mark as recently used
+		os.utime(path)
+		return value
+
+	def set(self, key, value):
+		# write to a temporary file first so readers never see partial entries
+		fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+		with os.fdopen(fd, 'wb') as f:
+			pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+		path = self._path(key)
+		# an overwritten entry no longer counts towards the total
+		try:
+			self._size -= os.path.getsize(path)
+		except FileNotFoundError:
+			pass
+		os.replace(tmp_path, path)
+		self._size += os.path.getsize(path)
+		if self._size > self.max_bytes:
+			self._evict()
+
+	def clear(self):
+		for entry in self._entries():
+			os.remove(entry.path)
+		self._size = 0
+
+	def _path(self, key):
+		return os.path.join(self.cache_dir, f'{key}.pkl')
+
+	def _entries(self):
+		return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.pkl')]
+
+	# remove least recently used entries until the cache is back under its size limit
+	def _evict(self):
+		entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+		self._size = sum(entry.stat().st_size for entry in entries)
+		for entry in entries:
+			if self._size <= self.max_bytes:
+				break
+			size = entry.stat().st_size
+			try:
+				os.remove(entry.path)
+			except FileNotFoundError:
+				pass
+			self._size -= size
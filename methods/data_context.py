@@ -0,0 +1,101 @@
+# Standardized data shared across methods
+"""
+A multi-method run used to refit StandardScaler for every method and recompute X.T @ X / n
+in max_cor_response, in the NumPy backends and again inside R. DataContext standardizes X
+once and computes the covariance, correlation, eigenvalues, column schema and fingerprint
+on first use, keeping them for later methods. Every method wrapper, get_r_data, get_ci_test
+and utils.max_cor_response accept a DataContext in place of X. Numpy functions see the
+standardized matrix through __array__.
+
+Example:
+	data = DataContext(X)
+	lambda_ = 0.99 * min(max_cor_response(data, target_features))
+	results = {m: run_method(m, data, **method_configs[m]) for m in methods}
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+from .cache import fingerprint
+from .schema import column_types, infer_schema
+
+class DataContext:
+	"""
+	Standardized data matrix with lazily computed, cached summaries.
+
+	Parameters
+	--------------------------------
+	X : numpy.ndarray
+		Data matrix of shape (n, p).
+	standardize : bool
+		Center and scale the columns as StandardScaler does (zero-variance columns are only centered).
+	"""
+	def __init__(self, X, standardize=True):
+		X = np.asarray(X, dtype=float)
+		self.n, self.p = X.shape
+		# column statistics of the input
+		self.raw_mean = X.mean(axis=0)
+		self.raw_std = X.std(axis=0)
+		if standardize:
+			scale = np.where(self.raw_std == 0, 1, self.raw_std)
+			X = (X - self.raw_mean) / scale
+		self.X = X
+		self.standardized = standardize
+
+	@property
+	def shape(self):
+		return self.n, self.p
+
+	def __array__(self, dtype=None, copy=None):
+		return self.X if dtype is None else self.X.astype(dtype)
+
+	@cached_property
+	def key(self):
+		"""Content fingerprint of the standardized X."""
+		return fingerprint(self.X)
+
+	@cached_property
+	def mean(self):
+		return self.X.mean(axis=0)
+
+	@cached_property
+	def std(self):
+		return self.X.std(axis=0)
+
+	@cached_property
+	def covariance(self):
+		"""Covariance matrix with denominator n (equal to X.T @ X / n for standardized X)."""
+		centered = self.X - self.mean
+		return centered.T @ centered / self.n
+
+	@cached_property
+	def correlation(self):
+		scale = np.where(self.std == 0, 1, self.std)
+		return self.covariance / np.outer(scale, scale)
+
+	@cached_property
+	def eigenvalues(self):
+		"""Eigenvalues of the covariance matrix in ascending order."""
+		return np.linalg.eigvalsh(self.covariance)
+
+	def schema(self, cat_threshold=10):
+		"""Column schema (see schema.py); the sort over all columns runs only once per context."""
+		if '_schema' not in self.__dict__:
+			self._schema = infer_schema(self.X, cat_threshold)
+		if self._schema['cat_threshold'] != cat_threshold:
+			return {**self._schema, **column_types(self._schema, cat_threshold)}
+		return self._schema
+
+	@cached_property
+	def r_data(self):
+		"""RData handle of the standardized X (starts R on first access)."""
+		from .r_data import get_r_data
+		return get_r_data(self.X, key=self.key)
+
+	# ship only the data to worker processes; summaries are recomputed there if needed
+	def __getstate__(self):
+		return {name: self.__dict__[name] for name in ('n', 'p', 'raw_mean', 'raw_std', 'X', 'standardized', 'key', '_schema') if name in self.__dict__}
+
+	def __repr__(self):
+		return f'DataContext(n={self.n}, p={self.p}, standardized={self.standardized})'
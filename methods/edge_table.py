@@ -0,0 +1,125 @@
+# Array-backed edge tables for PFS results
+"""
+pfs returns its graph as a dict {(i, j): q}. Expanding it into a dense p x p matrix, or
+walking it node by node, takes a Python loop over the edges and every node. EdgeTable
+holds the same graph as parallel arrays: int32 endpoints with i < j, sorted, and float32
+q-values. A CSR index over both orientations is built on first use and gives the neighbors
+of a node in O(degree). Conversions to and from dicts, scipy sparse matrices, dense
+matrices and SparseAdjacency run without Python loops over the edges.
+
+Example:
+	table = EdgeTable.from_dict(pfs(X, **config), p)
+	A = table.adjacency()
+	nodes, q = table.neighbors(target)
+"""
+
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+
+from .adjacency import SparseAdjacency
+
+class EdgeTable:
+	"""
+	Undirected weighted graph stored as parallel edge arrays.
+
+	Parameters
+	--------------------------------
+	rows, cols : array_like of int
+		Edge endpoints, in either orientation.
+	q : array_like of float
+		Edge weights (q-values); an edge given more than once keeps its smallest q.
+	p : int
+		Number of nodes.
+	"""
+	def __init__(self, rows, cols, q, p):
+		rows = np.asarray(rows, dtype=np.int64)
+		cols = np.asarray(cols, dtype=np.int64)
+		q = np.asarray(q, dtype=np.float32)
+		lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+		# sort by edge, then q, so the first copy of each edge has the smallest q
+		order = np.lexsort((q, hi, lo))
+		lo, hi, q = lo[order], hi[order], q[order]
+		first = np.ones(lo.size, dtype=bool)
+		first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+		self.rows = lo[first].astype(np.int32)
+		self.cols = hi[first].astype(np.int32)
+		self.q = q[first]
+		self.p = p
+		self._index = None
+
+	@classmethod
+	def from_dict(cls, Q, p):
+		"""Build from a pfs result {(i, j): q}."""
+		edges = np.fromiter(chain.from_iterable(Q.keys()), dtype=np.int64, count=2 * len(Q)).reshape(-1, 2)
+		q = np.fromiter(Q.values(), dtype=float, count=len(Q))
+		return cls(edges[:,0], edges[:,1], q, p)
+
+	@classmethod
+	def from_sparse(cls, matrix):
+		"""Build from a (dense or sparse) symmetric matrix of q-values; nonzero entries are edges."""
+		coo = sparse.coo_matrix(matrix)
+		keep = (coo.row <= coo.col) & (coo.data != 0)
+		return cls(coo.row[keep], coo.col[keep], coo.data[keep], coo.shape[0])
+
+	def __len__(self):
+		return self.rows.size
+
+	@property
+	def shape(self):
+		return self.p, self.p
+
+	def to_dict(self):
+		"""{(i, j): q} with i < j, as returned by pfs."""
+		return dict(zip(zip(self.rows.tolist(), self.cols.tolist()), self.q.tolist()))
+
+	def to_sparse(self, dtype=float):
+		"""Symmetric CSR matrix of q-values."""
+		rows = np.concatenate([self.rows, self.cols])
+		cols = np.concatenate([self.cols, self.rows])
+		q = np.concatenate([self.q, self.q]).astype(dtype)
+		return sparse.csr_matrix((q, (rows, cols)), shape=self.shape)
+
+	def toarray(self):
+		"""Dense symmetric matrix of q-values (zero where there is no edge)."""
+		A = np.zeros(self.shape)
+		A[self.rows, self.cols] = self.q
+		A[self.cols, self.rows] = self.q
+		return A
+
+	def adjacency(self):
+		"""Binary SparseAdjacency of the edges."""
+		return SparseAdjacency.from_edges(self.rows, self.cols, self.p)
+
+	def _csr(self):
+		if self._index is None:
+			self._index = self.to_sparse(dtype=np.float32)
+		return self._index
+
+	def neighbors(self, i):
+		"""Neighbors of node i and the q-values of the connecting edges."""
+		csr = self._csr()
+		start, end = csr.indptr[i], csr.indptr[i + 1]
+		return csr.indices[start:end], csr.data[start:end]
+
+	def incident(self, nodes):
+		"""Edges leaving any of nodes, as arrays (source, target, q)."""
+		csr = self._csr()
+		nodes = np.asarray(nodes, dtype=np.int64)
+		starts, ends = csr.indptr[nodes], csr.indptr[nodes + 1]
+		degrees = ends - starts
+		source = np.repeat(nodes, degrees)
+		# positions starts[k], ..., ends[k] - 1 of every node, concatenated
+		positions = np.arange(degrees.sum()) - np.repeat(np.cumsum(degrees) - degrees, degrees) + np.repeat(starts, degrees)
+		return source, csr.indices[positions], csr.data[positions]
+
+	def __getstate__(self):
+		return {'rows': self.rows, 'cols': self.cols, 'q': self.q, 'p': self.p}
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._index = None
+
+	def __repr__(self):
+		return f'EdgeTable(p={self.p}, edges={len(self)})'
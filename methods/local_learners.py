@@ -0,0 +1,82 @@
+# Local neighborhood learners in NumPy
+"""
+Python versions of bnlearn's learn.nbr for mmpc and si.hiton.pc with Gaussian tests.
+They run on a PartialCorrelationTest (see ci_tests.py) and return the parents and
+children of one node. When a node is added in the mmpc forward phase, only conditioning
+sets containing that node are new, so the maximum p-value of each remaining candidate is
+updated with those sets only. Each set is tested against all candidates in one batch.
+hpc and the markov blanket methods have no NumPy learner and always run in R.
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+def _subsets(nodes, max_size=None):
+	max_size = len(nodes) if max_size is None else min(max_size, len(nodes))
+	for size in range(max_size + 1):
+		yield from combinations(nodes, size)
+
+# remove nodes of cpc that are independent of node given a subset of the other nodes of cpc
+def _backward(test, node, cpc, alpha, max_sx):
+	cpc = list(cpc)
+	for y in list(cpc):
+		others = [z for z in cpc if z != y]
+		for T in _subsets(others, max_sx):
+			if len(T) and test.pvalues(node, [y], T)[0] > alpha:
+				cpc.remove(y)
+				break
+	return cpc
+
+def mmpc(test, node, alpha=0.05, max_sx=None):
+	"""Max-min parents and children of node."""
+	candidates = np.array([j for j in range(test.p) if j != node])
+	max_p = test.pvalues(node, candidates)
+	cpc = []
+	while True:
+		keep = max_p <= alpha
+		candidates, max_p = candidates[keep], max_p[keep]
+		if not candidates.size:
+			break
+
+		# add the candidate with the strongest minimum association (smallest maximum p-value)
+		best = np.argmin(max_p)
+		new = int(candidates[best])
+		candidates, max_p = np.delete(candidates, best), np.delete(max_p, best)
+
+		# the new conditioning sets are the subsets of cpc extended by the new node
+		max_size = None if max_sx is None else max_sx - 1
+		for T in (_subsets(cpc, max_size) if max_size is None or max_size >= 0 else ()):
+			if not candidates.size:
+				break
+			max_p = np.maximum(max_p, test.pvalues(node, candidates, T + (new,)))
+			keep = max_p <= alpha
+			candidates, max_p = candidates[keep], max_p[keep]
+		cpc.append(new)
+
+	return _backward(test, node, cpc, alpha, max_sx)
+
+def si_hiton_pc(test, node, alpha=0.05, max_sx=None):
+	"""Semi-interleaved HITON parents and children of node."""
+	candidates = np.array([j for j in range(test.p) if j != node])
+	pvalues = test.pvalues(node, candidates)
+	associated = pvalues <= alpha
+	# candidates in order of decreasing marginal association
+	order = candidates[associated][np.argsort(pvalues[associated], kind='stable')]
+
+	cpc = []
+	for y in order:
+		independent = False
+		for T in _subsets(cpc, max_sx):
+			if len(T) and test.pvalues(node, [y], T)[0] > alpha:
+				independent = True
+				break
+		if not independent:
+			cpc.append(int(y))
+
+	return _backward(test, node, cpc, alpha, max_sx)
+
+local_learners = {
+	'mmpc': mmpc,
+	'si.hiton.pc': si_hiton_pc
+}
@@ -22,6 +22,8 @@ method_names = {
 	# huge
 	'glasso':'Glasso',
 	'mb':'NLasso',
+	'glasso_numpy':'Glasso(NumPy)',
+	'mb_numpy':'NLasso(NumPy)',
 
 	# pfs
 	'pfs':'PFS',
@@ -36,7 +38,7 @@ method_names = {
 
 bnlearn_methods = ['aracne', 'fast_iamb', 'hpc', 'iamb', 'mmpc', 'pc_stable', 'si_hiton_pc']
 bnlearn_local_methods = [method + '_local' for method in bnlearn_methods]
-huge_methods = ['glasso', 'mb']
+huge_methods = ['glasso', 'mb', 'glasso_numpy', 'mb_numpy']
 silggm_methods = ['bnwsl', 'dsgl', 'dsnwsl', 'gfcl', 'gfcsl']
 
 def method_type(method):
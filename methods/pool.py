@@ -0,0 +1,70 @@
+# Persistent pool of R worker processes
+"""
+Embedded R cannot be used from threads, so every call to run_method runs serially in
+the calling process. MethodPool keeps a fixed set of long-lived worker processes, each
+with its own embedded R session. The R packages are loaded once when a worker starts,
+and method calls are sent to the workers asynchronously as concurrent.futures.Future
+objects.
+
+Example:
+	with MethodPool(n_workers=8) as pool:
+		futures = {m: pool.submit_method(m, X, **method_configs[m]) for m in methods}
+		results = {m: f.result() for m, f in futures.items()}
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import os
+
+r_packages = ('huge', 'SILGGM', 'mgm', 'bnlearn')
+
+def _init_worker(packages):
+	from methods.r_packages import load_package
+	for package in packages:
+		load_package(package)
+
+def _ready():
+	return os.getpid()
+
+def _run_method(method_name, X, kwargs):
+	from methods import run_method
+	return run_method(method_name, X, **kwargs)
+
+class MethodPool(ProcessPoolExecutor):
+	"""
+	Process pool whose workers each hold a persistent embedded R session.
+
+	Parameters
+	--------------------------------
+	n_workers : int, optional
+		Number of worker processes. Defaults to the number of CPUs.
+	packages : tuple of str
+		R packages loaded once in every worker when it starts.
+	"""
+	def __init__(self, n_workers=None, packages=r_packages):
+		if n_workers is None:
+			n_workers = os.cpu_count()
+		# forking a process with an embedded R session is unsafe, so workers are always spawned
+		super().__init__(
+			max_workers=n_workers,
+			mp_context=multiprocessing.get_context('spawn'),
+			initializer=_init_worker,
+			initargs=(tuple(packages),)
+		)
+		self.n_workers = n_workers
+
+	def start(self):
+		"""
+		Start all workers and wait until each has loaded its packages. Workers are otherwise
+		spawned on the first submissions, so callers that time their tasks start the pool first.
+		"""
+		# workers are spawned while none is idle, so n_workers concurrent tasks start all of them
+		wait([self.submit(_ready) for _ in range(self.n_workers)])
+		return self
+
+	def submit_method(self, method_name, X, **kwargs):
+		"""Run run_method(method_name, X, **kwargs) in a worker and return a Future."""
+		from methods import all_methods
+		if method_name not in all_methods:
+			raise ValueError(f'Unsupported method: {method_name}')
+		return self.submit(_run_method, method_name, X, kwargs)
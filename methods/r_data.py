@@ -0,0 +1,112 @@
+# Shared R handles for data matrices
+"""
+Every wrapper used to convert X to R with numpy2ri on each call, and the bnlearn wrappers
+additionally built a data.frame with columns V1..Vp. RData performs these conversions once
+and keeps the R objects alive. Handles are cached by a content fingerprint of X, so a sweep
+over several methods on the same data pays for the conversion only once. All wrappers accept
+either a numpy array, an RData handle or a DataContext.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+import rpy2.robjects as robjects
+from rpy2.robjects import numpy2ri
+from rpy2.robjects.conversion import localconverter
+
+from .cache import fingerprint
+from .data_context import DataContext
+
+# maximum number of handles kept alive by get_r_data
+max_cached = 4
+_cache = OrderedDict()
+
+class RData:
+	"""
+	Data matrix converted to R once, with a lazily built bnlearn-style data.frame.
+
+	Parameters
+	--------------------------------
+	X : numpy.ndarray
+		Data matrix of shape (n, p).
+	key : str, optional
+		Fingerprint of X, computed if not provided.
+	"""
+	def __init__(self, X, key=None):
+		self.X = np.asarray(X, dtype=float)
+		self.n, self.p = self.X.shape
+		self.key = fingerprint(self.X) if key is None else key
+		with localconverter(robjects.default_converter + numpy2ri.converter):
+			self.matrix = robjects.conversion.py2rpy(self.X)
+		self._data_frame = None
+
+	@property
+	def shape(self):
+		return self.n, self.p
+
+	@property
+	def data_frame(self):
+		if self._data_frame is None:
+			X_r = robjects.r['as.data.frame'](self.matrix)
+			# bnlearn requires column names
+			robjects.r.colnames(X_r).ro = [f'V{i + 1}' for i in range(self.p)]
+			self._data_frame = X_r
+		return self._data_frame
+
+	# R objects cannot be pickled; rebuild (or reuse) the handle on the receiving side
+	def __reduce__(self):
+		return (get_r_data, (self.X,))
+
+def get_r_data(X, key=None):
+	"""Return the cached RData handle for X, converting X to R only on a cache miss."""
+	if isinstance(X, RData):
+		return X
+	if isinstance(X, DataContext):
+		return X.r_data
+	X = np.asarray(X, dtype=float)
+	if key is None:
+		key = fingerprint(X)
+	if key in _cache:
+		_cache.move_to_end(key)
+		return _cache[key]
+	handle = RData(X, key=key)
+	_cache[key] = handle
+	while len(_cache) > max_cached:
+		_cache.popitem(last=False)
+	return handle
+
+def get_shared_r_data(path, key):
+	"""
+	Return the cached RData handle with fingerprint key, reading X from the .npy file at path
+	only on a cache miss. Pool tasks pass (path, key) instead of X, so the data reaches each
+	worker once rather than with every task.
+	"""
+	if key in _cache:
+		_cache.move_to_end(key)
+		return _cache[key]
+	return get_r_data(np.load(path), key=key)
+
+# R function returning the (row, col) indices of the nonzero entries of a dense or sparse (Matrix) matrix
+@lru_cache(maxsize=None)
+def _nonzero_fun():
+	return robjects.r('''
+	function(A) {
+		if (methods::is(A, "sparseMatrix")) {
+			s <- Matrix::summary(A)
+			keep <- if (is.null(s$x)) rep(TRUE, nrow(s)) else s$x != 0
+			idx <- cbind(s$i, s$j)[keep, , drop=FALSE]
+		} else {
+			idx <- which(as.matrix(A) != 0, arr.ind=TRUE)
+		}
+		storage.mode(idx) <- "integer"
+		unname(idx)
+	}
+	''')
+
+def r_nonzero(A):
+	"""Zero-based (rows, cols) of the nonzero entries of an R matrix, transferred in one call without densifying sparse matrices."""
+	with localconverter(robjects.default_converter + numpy2ri.converter):
+		idx = np.asarray(_nonzero_fun()(A), dtype=np.int64).reshape(-1, 2) - 1
+	return idx[:,0], idx[:,1]
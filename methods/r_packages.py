@@ -0,0 +1,9 @@
+# Load R packages on first use
+
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def load_package(name):
+	"""Import an R package with rpy2, starting embedded R if needed. Each package is loaded once per process."""
+	from rpy2.robjects.packages import importr
+	return importr(name)
@@ -6,18 +6,24 @@ certain target features. In bnlearn, there are two functions for learning the ra
 neighborhood around a node/feature: learn.mb learns the markov blanket of a node and learn.nbr
 learns the parents and children of a node. The only methods compatible with learn.mb are
 fast.iamb, gs, iamb, iamb.fdr, and inter.iamb. The only methods compatible with learn.nbr
-are hpc, mmpc, pc.stable, and si.hiton.pc.
+are hpc, mmpc, pc.stable, and si.hiton.pc. With backend='numpy', run_bnlearn_local learns
+mmpc and si.hiton.pc neighborhoods in Python (see local_learners.py) and does not start R.
 """
 
+from functools import lru_cache
+import os
+import tempfile
 import time
+
 import numpy as np
 
-import rpy2.robjects as robjects
-from rpy2.robjects import numpy2ri
-from rpy2.robjects.conversion import localconverter
-from rpy2.robjects.packages import importr
+from .adjacency import SparseAdjacency
+from .cache import DiskCache
+from .ci_tests import get_ci_test
+from .local_learners import local_learners
+from .r_packages import load_package
 
-bnlearn = importr('bnlearn')
+# rpy2 and the R data handles are imported inside the R code paths, so the numpy backend runs without R
 
 constraint_based = {
 	'gs',
@@ -37,6 +43,20 @@ pairwise_mi = {
 	'aracne'
 }
 
+# R function returning the markov blankets of all nodes as one (node, neighbor) index matrix
+@lru_cache(maxsize=None)
+def _mb_edges():
+	import rpy2.robjects as robjects
+	return robjects.r('''
+	function(res) {
+		nodes <- res$nodes
+		mb <- lapply(nodes, function(node) node$mb)
+		i <- rep(seq_along(mb), lengths(mb))
+		j <- match(unlist(mb, use.names=FALSE), names(nodes))
+		cbind(i, j)
+	}
+	''')
+
 def _sanitize_kwargs(d):
 	out = {}
 	for k, v in d.items():
@@ -50,20 +70,20 @@ def _sanitize_kwargs(d):
 # Global version of bnlearn methods
 #----------------------------------------------------------------
 def run_bnlearn(X, method, **bnlearn_args):
-	n, p = X.shape
-	adjacency = np.zeros((p, p), dtype=int)
+	import rpy2.robjects as robjects
+	from rpy2.robjects import numpy2ri
+	from rpy2.robjects.conversion import localconverter
+	from .r_data import get_r_data
+
+	data = get_r_data(X)
+	n, p = data.shape
 
 	bnlearn_args = _sanitize_kwargs(bnlearn_args)
 	if method in constraint_based:
 		bnlearn_args.setdefault('undirected', True)
 
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		X_r = robjects.conversion.py2rpy(X)
-
-	X_r = robjects.r['as.data.frame'](X_r)
-
-	# bnlearn requires column names
-	robjects.r.colnames(X_r).ro = [f'V{i + 1}' for i in range(p)]
+	X_r = data.data_frame
+	bnlearn = load_package('bnlearn')
 
 	start_time = time.time()
 
@@ -72,12 +92,10 @@ def run_bnlearn(X, method, **bnlearn_args):
 
 	res = f(X_r, robjects.NULL, **bnlearn_args)
 
-	for i in range(p):
-		mb = list(res.rx2('nodes')[i].rx2('mb'))
-		for v in mb:
-			j = int(v[1:]) - 1
-			adjacency[i,j] = 1
-			adjacency[j,i] = 1
+	# transfer all edges in a single call instead of querying each node
+	with localconverter(robjects.default_converter + numpy2ri.converter):
+		edges = np.asarray(_mb_edges()(res), dtype=int).reshape(-1, 2) - 1
+	adjacency = SparseAdjacency.from_edges(edges[:,0], edges[:,1], p)
 
 	runtime = time.time() - start_time
 
@@ -86,80 +104,182 @@ def run_bnlearn(X, method, **bnlearn_args):
 #----------------------------------------------------------------
 # Local version of bnlearn methods
 #----------------------------------------------------------------
-def run_bnlearn_local(X, method, target_features, radius=1, criterion=None, verbose=False, **bnlearn_args):
-	n, p = X.shape
-	adjacency = np.zeros((p, p), dtype=int)
-
+mb_methods  = {'fast.iamb', 'gs', 'iamb', 'inter.iamb', 'iamb.fdr'}
+nbr_methods = {'hpc', 'mmpc', 'pc.stable', 'si.hiton.pc'}
+
+# radius-1 neighborhood of a single node (0-based indices); runs in the caller or in a pool worker
+def _local_neighbors(X, method, node, bnlearn_args):
+	import rpy2.robjects as robjects
+	from .r_data import get_r_data
+
+	data = get_r_data(X)
+	load_package('bnlearn')
+	local_fun = robjects.r['learn.mb'] if method in mb_methods else robjects.r['learn.nbr']
+	neigh = local_fun(data.data_frame, f'V{node + 1}', method=method, **bnlearn_args)
+	return [int(str(v)[1:]) - 1 for v in neigh]
+
+# pool version: X is read from the shared .npy file once per worker and then found by its key
+def _local_neighbors_shared(path, key, method, node, bnlearn_args):
+	from .r_data import get_shared_r_data
+	return _local_neighbors(get_shared_r_data(path, key), method, node, bnlearn_args)
+
+# the same query answered by the Python learner on a PartialCorrelationTest
+def _local_neighbors_numpy(test, method, node, bnlearn_args):
+	return local_learners[method](test, node, alpha=bnlearn_args.get('alpha', 0.05), max_sx=bnlearn_args.get('max.sx'))
+
+def run_bnlearn_local(X, method, target_features, radius=1, criterion=None, verbose=False, 
+		n_workers=1, pool=None, cache=None, backend='R', **bnlearn_args):
+	"""
+	Nodes in the same radius layer are independent, so with n_workers > 1 (or an existing
+	MethodPool passed as pool) their learn.mb/learn.nbr calls run concurrently in R worker
+	processes. Neighborhoods are merged in sorted node order, so the result does not depend
+	on the number of workers or the order in which calls finish. A pool created here is
+	started before the timer, and X is written once to a temporary .npy file that each
+	worker reads on its first task, so neither worker startup nor copies of X per node are
+	part of runtime.
+
+	If cache is True, a directory path, or a DiskCache, each node's neighborhood is memoized
+	on disk under (data fingerprint, method, bnlearn_args, node), so later radii, other target
+	sets and re-runs on the same data reuse earlier queries. Nodes loaded from the cache are
+	not recomputed, so their cost is missing from runtime; the output then also holds
+	'cache_hits' (number of nodes loaded) and 'cached' (True if there were any).
+
+	With backend='numpy', mmpc and si.hiton.pc neighborhoods are learned in Python from a
+	cached correlation matrix, sequentially in the calling process (n_workers and pool are
+	ignored). Only the arguments alpha, test ('cor', 'zf' or 'mi-g') and max.sx are
+	supported. The other methods have no NumPy backend and raise a ValueError. The output
+	records the backend used under 'backend'.
+	"""
 	bnlearn_args = _sanitize_kwargs(bnlearn_args)
 
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		X_r = robjects.conversion.py2rpy(X)
-	X_r = robjects.r['as.data.frame'](X_r)
-	robjects.r.colnames(X_r).ro = [f'V{i + 1}' for i in range(p)]
+	if method not in mb_methods and method not in nbr_methods:
+		raise ValueError(f"Method '{method}' is not supported.")
+	if backend not in ('R', 'numpy'):
+		raise ValueError(f"Backend '{backend}' is not supported.")
+
+	if backend == 'numpy' and method not in local_learners:
+		raise ValueError(f'No NumPy backend for {method}')
+
+	use_numpy = backend == 'numpy'
+	if use_numpy:
+		unsupported = set(bnlearn_args) - {'alpha', 'test', 'max.sx'}
+		if unsupported:
+			raise TypeError(f'Unsupported arguments for the numpy backend: {", ".join(sorted(unsupported))}')
+		data = get_ci_test(X, bnlearn_args.get('test', 'cor'))
+		learn = _local_neighbors_numpy
+		pool = None
+	else:
+		from .r_data import get_r_data
+		data = get_r_data(X)
+		learn = _local_neighbors
+	n, p = data.n, data.p
+	edges = set()
+
+	if cache is True:
+		cache = DiskCache()
+	elif isinstance(cache, str):
+		cache = DiskCache(cache)
+	args_key = tuple(sorted(bnlearn_args.items()))
+	# the two backends can disagree on borderline tests, so their results are cached separately
+	query = (data.key, method, args_key) + (('numpy',) if use_numpy else ())
+
+	own_pool = pool is None and n_workers > 1 and not use_numpy
+	if own_pool:
+		from .pool import MethodPool
+		pool = MethodPool(n_workers=n_workers, packages=('bnlearn',)).start()
+
+	shared_dir = None
+	if pool is not None:
+		# tasks carry the path and fingerprint of X instead of X itself
+		shared_dir = tempfile.TemporaryDirectory()
+		shared_path = os.path.join(shared_dir.name, f'{data.key}.npy')
+		np.save(shared_path, data.X)
+	elif not use_numpy:
+		# build the R data.frame and load bnlearn outside the timed region
+		data.data_frame
+		load_package('bnlearn')
 
 	start_time = time.time()
 
-	learn_mb  = robjects.r['learn.mb']
-	learn_nbr = robjects.r['learn.nbr']
-
-	mb_methods  = {'fast.iamb', 'gs', 'iamb', 'inter.iamb', 'iamb.fdr'}
-	nbr_methods = {'hpc', 'mmpc', 'pc.stable', 'si.hiton.pc'}
-
-	if method in mb_methods:
-		local_fun = learn_mb
-	elif method in nbr_methods:
-		local_fun = learn_nbr
-	else:
-		raise ValueError(f"Method '{method}' is not supported.")
-
 	visited = set()
+	cache_hits = 0
 	if isinstance(target_features, (list, tuple, np.ndarray)):
 		frontier = set(int(i) for i in np.asarray(target_features).ravel())
 	else:
 		frontier = {int(target_features)}
 
-	for r in range(radius):
-
-		if verbose:
-			node_iteration = 1
-			print(f'current features: {frontier} (radius = {r + 1}/{radius})')
-
-		new_frontier = set()
-
-		for i in frontier:
-
-			if verbose:
-				start = time.time()
-
-			if i in visited:
-				continue
-			visited.add(i)
-
-			node_name = f'V{i+1}'
-			neigh = list(local_fun(X_r, node_name, method=method, **bnlearn_args))
-
-			for v in neigh:
-				j = int(str(v)[1:]) - 1
-
-				if criterion == 'forward':
-					# only accept edges from current layer to unseen nodes
-					if j not in visited:
-						adjacency[i, j] = adjacency[j, i] = 1
-						new_frontier.add(j)
-
-				else:  # union-style (original behavior)
-					adjacency[i, j] = adjacency[j, i] = 1
-					if j not in visited:
-						new_frontier.add(j)
+	try:
+		for r in range(radius):
 
 			if verbose:
-				runtime = time.time() - start
-				print(f' - iteration {node_iteration}/{len(frontier)} ({runtime:.2f} seconds)')
-				node_iteration += 1
-
-		frontier = new_frontier
+				print(f'current features: {frontier} (radius = {r + 1}/{radius})')
+
+			layer = sorted(i for i in frontier if i not in visited)
+
+			# reuse memoized neighborhoods, then learn the rest
+			neighbors = {}
+			if cache is not None:
+				for i in layer:
+					neigh = cache.get(DiskCache.key(*query, i))
+					if neigh is not None:
+						neighbors[i] = neigh
+			missing = [i for i in layer if i not in neighbors]
+			cache_hits += len(layer) - len(missing)
+
+			if pool is None:
+				for node_iteration, i in enumerate(missing):
+					if verbose:
+						start = time.time()
+					neighbors[i] = learn(data, method, i, bnlearn_args)
+					if verbose:
+						runtime = time.time() - start
+						print(f' - iteration {node_iteration + 1}/{len(missing)} ({runtime:.2f} seconds)')
+			elif missing:
+				if verbose:
+					start = time.time()
+				futures = {i: pool.submit(_local_neighbors_shared, shared_path, data.key, method, i, bnlearn_args) for i in missing}
+				neighbors.update({i: future.result() for i, future in futures.items()})
+				if verbose:
+					runtime = time.time() - start
+					print(f' - {len(missing)} nodes on {pool.n_workers} workers ({runtime:.2f} seconds)')
+
+			if cache is not None:
+				for i in missing:
+					cache.set(DiskCache.key(*query, i), neighbors[i])
+			if verbose and len(missing) < len(layer):
+				print(f' - {len(layer) - len(missing)} nodes loaded from cache')
+
+			# merge in sorted order, exactly as a sequential pass over the layer would
+			new_frontier = set()
+
+			for i in layer:
+				visited.add(i)
+
+				for j in neighbors[i]:
+
+					if criterion == 'forward':
+						# only accept edges from current layer to unseen nodes
+						if j not in visited:
+							edges.add((i, j))
+							new_frontier.add(j)
+
+					else:  # union-style (original behavior)
+						edges.add((i, j))
+						if j not in visited:
+							new_frontier.add(j)
+
+			frontier = new_frontier
+	finally:
+		if own_pool:
+			pool.shutdown()
+		if shared_dir is not None:
+			shared_dir.cleanup()
+
+	rows, cols = zip(*edges) if edges else ((), ())
+	adjacency = SparseAdjacency.from_edges(rows, cols, p)
 
 	runtime = time.time() - start_time
-	return {'adjacency_matrix': adjacency, 'runtime': runtime}
-
-
+	output = {'adjacency_matrix': adjacency, 'runtime': runtime, 'backend': backend}
+	if cache is not None:
+		output.update({'cache_hits': cache_hits, 'cached': cache_hits > 0})
+	return output
@@ -9,17 +9,23 @@ import time
 import numpy as np
 
 import rpy2.robjects as robjects
-from rpy2.robjects import FloatVector, numpy2ri
-from rpy2.robjects.conversion import localconverter
-from rpy2.robjects.packages import importr
+from rpy2.robjects import FloatVector
 
-# import R package
-huge = importr('huge')
+from .adjacency import SparseAdjacency
+from .r_data import get_r_data, r_nonzero
+from .r_packages import load_package
 
 def run_huge(X, method, **huge_args):
+	"""
+	criterion and lambda_ may each be a single value or a list. The regularization path is
+	computed once and, for a list, adjacency_matrix is a dict keyed by criterion (or by
+	lambda), mirroring the alpha-keyed output of run_silggm. If lambda_ is given, criterion
+	is ignored.
+	"""
 
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		X_r = robjects.conversion.py2rpy(X)
+	huge = load_package('huge')
+	data = get_r_data(X)
+	X_r = data.matrix
 
 	criterion = huge_args.pop('criterion', 'ric')
 	lambda_ = huge_args.pop('lambda_', None)
@@ -31,23 +37,32 @@ def run_huge(X, method, **huge_args):
 		X_r = npn(X_r, verbose=False)
 
 	if lambda_ is not None:
-		lambda_ = FloatVector([float(lambda_)])
+		if isinstance(lambda_, (list, tuple, np.ndarray)):
+			keys = [float(l) for l in lambda_]
+		else:
+			keys = [float(lambda_)]
+		# huge expects a decreasing lambda sequence
+		path_lambdas = sorted(set(keys), reverse=True)
 		start_time = time.time()
-		result = huge.huge(X_r, method=method, verbose=False, **{'lambda': lambda_}, **huge_args)
+		result = huge.huge(X_r, method=method, verbose=False, **{'lambda': FloatVector(path_lambdas)}, **huge_args)
 		runtime = time.time() - start_time
-		A = result.rx2('path')[0]
+		path = result.rx2('path')
+		adjacency_matrix = {l: SparseAdjacency.from_edges(*r_nonzero(path[path_lambdas.index(l)]), data.p) for l in keys}
 	else:
+		if isinstance(criterion, (list, tuple)):
+			keys = list(criterion)
+		else:
+			keys = [criterion]
 		start_time = time.time()
 		result = huge.huge(X_r, method=method, verbose=False, **huge_args)
-		select = huge.huge_select(result, criterion=criterion, verbose=False)
+		selected = {c: huge.huge_select(result, criterion=c, verbose=False) for c in keys}
 		runtime = time.time() - start_time
-		A = select.rx2('refit')
+		adjacency_matrix = {c: SparseAdjacency.from_edges(*r_nonzero(selected[c].rx2('refit')), data.p) for c in keys}
 
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		A_numpy = np.array(robjects.r['as.matrix'](A))
-
-	adjacency_matrix = (A_numpy != 0).astype(int)
-
-	return {'adjacency_matrix':adjacency_matrix, 'runtime':runtime}
+	if len(keys) == 1:
+		adjacency_matrix = adjacency_matrix[keys[0]]
 
+	output = {'adjacency_matrix':adjacency_matrix, 'runtime':runtime}
+	output['lambdas' if lambda_ is not None else 'criteria'] = keys
 
+	return output
@@ -6,59 +6,36 @@
 
 import time
 
-import numpy as np
-
-import rpy2.robjects as robjects
-from rpy2.robjects.packages import importr
-from rpy2.robjects import numpy2ri
-from rpy2.robjects.conversion import localconverter
-
-# import R package
-mgm = importr('mgm')
-
-import numpy as np
-
 import rpy2.robjects as robjects
-from rpy2.robjects.packages import importr
-from rpy2.robjects import numpy2ri
-from rpy2.robjects.conversion import localconverter
 
-# import R package
-mgm = importr('mgm')
-
-def run_mgm(X, **mgm_args):
+from .adjacency import SparseAdjacency
+from .data_context import DataContext
+from .r_data import get_r_data, r_nonzero
+from .r_packages import load_package
+from .schema import column_types, infer_schema
+
+def run_mgm(X, schema=None, **mgm_args):
+	"""
+	Column types and levels come from schema (see schema.py) if given, from the cached
+	schema of a DataContext, or otherwise from infer_schema.
+	"""
 	mgm_args.setdefault('k', 2)
 	cat_threshold = mgm_args.pop('cat_threshold', 10)
 
-	n, p = X.shape
-	feature_type = []
-	level = []
-
-	for j in range(p):
-		col = X[:, j]
-		unique_vals, counts = np.unique(col, return_counts=True)
+	if schema is None:
+		schema = X.schema(cat_threshold) if isinstance(X, DataContext) else infer_schema(get_r_data(X).X, cat_threshold)
+	elif schema['cat_threshold'] != cat_threshold:
+		schema = {**schema, **column_types(schema, cat_threshold)}
 
-		# constant variable
-		if len(unique_vals) == 1:
-			feature_type.append("g")
-			level.append(1)
-			continue
+	data = get_r_data(X)
+	n, p = data.shape
+	if len(schema['type']) != p:
+		raise ValueError(f'schema has {len(schema["type"])} columns but X has {p}')
+	feature_type = schema['type'].tolist()
+	level = schema['level'].tolist()
 
-		if len(unique_vals) <= cat_threshold:
-			# if every category has > 1 observation, treat as categorical
-			if np.all(counts >= 2):
-				feature_type.append("c")
-				level.append(len(unique_vals))
-			else:
-				# fallback to Gaussian
-				feature_type.append("g")
-				level.append(1)
-		else:
-			feature_type.append("g")
-			level.append(1)
-
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		X_r = robjects.conversion.py2rpy(X)
+	X_r = data.matrix
+	load_package('mgm')
 
 	mgm_fun = robjects.r['mgm']
 	# robjects.r('sink("/dev/null")')
@@ -71,10 +48,7 @@ def run_mgm(X, **mgm_args):
 		pass
 
 	A = result.rx2('pairwise').rx2('wadj')
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		A_numpy = np.array(A)
-
-	adjacency_matrix = (A_numpy != 0).astype(int)
+	adjacency_matrix = SparseAdjacency.from_edges(*r_nonzero(A), p)
 
 	return {'adjacency_matrix':adjacency_matrix, 'runtime':runtime}
 
@@ -0,0 +1,262 @@
+# NumPy versions of the huge methods 'mb' and 'glasso'
+"""
+Neighborhood selection (mb) fits p lasso regressions on the same data. Here the correlation
+matrix S is computed once and the p regressions share it: coordinate descent runs on blocks
+of nodes at once, each block using S and its own running products G = B @ S. Blocks are run
+in a thread pool. Each lambda is warm started from the solution at the previous, larger
+lambda, and the coordinate descent only cycles over the active set. Inactive coordinates
+are checked with one vectorized KKT test per block. The graphical lasso calls scikit-learn
+on S + lambda * I, which gives huge's penalty on the diagonal of the precision matrix.
+
+Defaults follow huge: data are standardized, the mb graph is symmetrized with the 'or' rule,
+and the convergence threshold is 1e-4. The RIC criterion uses the same rotation scheme as
+huge.select, but draws its rotations from NumPy, so the selected lambda can differ slightly
+from a given R run.
+
+Agreement with huge is checked by simulations/runtimes/nodewise_parity.py. scikit-learn's
+graphical lasso raises FloatingPointError on ill-conditioned problems (small lambda with
+p > n) that huge still solves.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import warnings
+
+import numpy as np
+from scipy.stats import norm, rankdata
+from sklearn.covariance import graphical_lasso
+from sklearn.exceptions import ConvergenceWarning
+
+from .adjacency import SparseAdjacency
+from .data_context import DataContext
+
+def run_nodewise(X, method, **huge_args):
+	"""
+	Drop-in replacement for run_huge with method 'mb' or 'glasso', without R.
+
+	Parameters
+	--------------------------------
+	X : numpy.ndarray or DataContext
+		Data matrix of shape (n, p).
+	method : str
+		'mb' (neighborhood selection) or 'glasso' (graphical lasso).
+	lambda_ : float or list of float, optional
+		Regularization parameter(s). If given, criterion is ignored.
+	criterion : str
+		Only 'ric' is supported.
+	apply_npn : bool
+		Apply the nonparanormal (shrunken rank) transformation first.
+	rep_num : int
+		Number of random rotations for RIC (default 20).
+	n_workers : int, optional
+		Threads for the mb blocks. Defaults to the number of CPUs.
+	block_size : int
+		Number of nodes per mb block.
+	tol, max_iter : float, int
+		Convergence threshold and maximum number of iterations per lambda: coordinate descent
+		sweeps for mb (default 100), graphical lasso iterations for glasso (default 1000).
+	random_state : int or numpy.random.Generator, optional
+		Source of the RIC rotations. If None, a seed is drawn from the global numpy random
+		state, so runs are reproducible under np.random.seed (as huge is under set.seed).
+
+	Returns
+	--------------------------------
+	output : dict
+		Same keys as run_huge: 'adjacency_matrix', 'runtime' and 'lambdas' or 'criteria'.
+		For glasso also 'converged', False if the solver stopped at max_iter for any lambda
+		(a ConvergenceWarning is then issued as well).
+	"""
+	if method not in ('mb', 'glasso'):
+		raise ValueError(f'Unsupported method: {method}')
+
+	criterion = huge_args.pop('criterion', 'ric')
+	lambda_ = huge_args.pop('lambda_', None)
+	apply_npn = huge_args.pop('apply_npn', False)
+	rep_num = huge_args.pop('rep_num', 20)
+	random_state = huge_args.pop('random_state', None)
+	rng = np.random.default_rng(np.random.randint(2**32) if random_state is None else random_state)
+	solver_args = {
+		'n_workers': huge_args.pop('n_workers', None),
+		'block_size': huge_args.pop('block_size', 512),
+		'tol': huge_args.pop('tol', 1e-4),
+		'max_iter': huge_args.pop('max_iter', 100 if method == 'mb' else 1000)
+	}
+	if huge_args:
+		raise TypeError(f'Unsupported arguments: {", ".join(huge_args)}')
+
+	start_time = time.time()
+
+	if isinstance(X, DataContext) and not apply_npn:
+		# reuse the cached correlation matrix; Z below is scaled with n - 1 as in R
+		Z = standardize(X.X)
+		n, p = Z.shape
+		S = X.correlation * (n - 1) / n
+	else:
+		X = np.asarray(X, dtype=float)
+		if apply_npn:
+			X = npn(X)
+		Z = standardize(X)
+		n, p = Z.shape
+		S = Z.T @ Z / n
+
+	if lambda_ is not None:
+		if isinstance(lambda_, (list, tuple, np.ndarray)):
+			keys = [float(l) for l in lambda_]
+		else:
+			keys = [float(lambda_)]
+		path_lambdas = sorted(set(keys), reverse=True)
+	else:
+		keys = list(criterion) if isinstance(criterion, (list, tuple)) else [criterion]
+		if any(c != 'ric' for c in keys):
+			raise ValueError('run_nodewise only supports criterion="ric"')
+		# huge.select refits at the RIC lambda
+		path_lambdas = [ric(Z, rep_num, rng)]
+
+	if method == 'mb':
+		path = _mb_path(S, path_lambdas, **solver_args)
+	else:
+		path, converged = _glasso_path(S, path_lambdas, tol=solver_args['tol'], max_iter=solver_args['max_iter'])
+	runtime = time.time() - start_time
+
+	if lambda_ is not None:
+		adjacency_matrix = {l: path[path_lambdas.index(l)] for l in keys}
+	else:
+		adjacency_matrix = {c: path[0] for c in keys}
+
+	if len(keys) == 1:
+		adjacency_matrix = adjacency_matrix[keys[0]]
+
+	output = {'adjacency_matrix':adjacency_matrix, 'runtime':runtime}
+	output['lambdas' if lambda_ is not None else 'criteria'] = keys
+	if method == 'glasso':
+		output['converged'] = all(converged)
+		if not output['converged']:
+			failed = ', '.join(f'{l:.3g}' for l, c in zip(path_lambdas, converged) if not c)
+			warnings.warn(f'glasso did not converge within max_iter={solver_args["max_iter"]} at lambda {failed}', ConvergenceWarning)
+
+	return output
+
+#----------------------------------------------------------------
+# Data transformations and lambda selection
+#----------------------------------------------------------------
+def standardize(X):
+	"""Center and scale columns to unit standard deviation (as R's scale)."""
+	Z = X - X.mean(axis=0)
+	return Z / Z.std(axis=0, ddof=1)
+
+def npn(X):
+	"""Shrunken rank nonparanormal transformation (huge.npn with npn.func='shrinkage')."""
+	n = X.shape[0]
+	return norm.ppf(rankdata(X, axis=0) / (n + 1))
+
+def ric(Z, rep_num=20, rng=None, block_size=1024):
+	"""
+	Rotation information criterion: the smallest, over rep_num random circular shifts of the
+	rows, of the largest absolute inner product between a shifted and an unshifted column,
+	divided by n.
+	"""
+	rng = np.random.default_rng(rng)
+	n, p = Z.shape
+	shifts = rng.integers(1, n, size=rep_num)
+	lambda_opt = np.inf
+	for shift in shifts:
+		Z_shifted = np.roll(Z, shift, axis=0)
+		# blocks of rows keep the p x p product out of memory
+		max_prod = max(np.abs(Z_shifted[:,i:i + block_size].T @ Z).max() for i in range(0, p, block_size))
+		lambda_opt = min(lambda_opt, max_prod)
+	return lambda_opt / n
+
+#----------------------------------------------------------------
+# Neighborhood selection
+#----------------------------------------------------------------
+def _mb_path(S, lambdas, n_workers=None, block_size=512, tol=1e-4, max_iter=100):
+	p = S.shape[0]
+	if n_workers is None:
+		n_workers = os.cpu_count()
+	blocks = [np.arange(start, min(start + block_size, p)) for start in range(0, p, block_size)]
+
+	# numpy releases the GIL inside the block updates, so threads share S without copies
+	with ThreadPoolExecutor(max_workers=n_workers) as executor:
+		block_paths = list(executor.map(lambda nodes: _mb_block(S, nodes, lambdas, tol, max_iter), blocks))
+
+	path = []
+	for l in range(len(lambdas)):
+		rows = np.concatenate([block_path[l][0] for block_path in block_paths])
+		cols = np.concatenate([block_path[l][1] for block_path in block_paths])
+		# 'or' rule: an edge is kept if either regression selects it
+		path.append(SparseAdjacency.from_edges(rows, cols, p))
+	return path
+
+def _mb_block(S, nodes, lambdas, tol, max_iter):
+	"""
+	Lasso paths of the nodes in one block regressed on all other variables. Row a of B holds
+	the coefficients of nodes[a], and G = B @ S. The loss for node j is
+	b' S b / 2 - S[j] b + lambda * |b|_1 with b_j = 0.
+	"""
+	p = S.shape[0]
+	m = len(nodes)
+	B = np.zeros((m, p))
+	G = np.zeros((m, p))
+	C = S[nodes]
+	diag = np.diag(S)
+	# row of each node within the block (-1 for nodes outside it)
+	own = np.full(p, -1)
+	own[nodes] = np.arange(m)
+	self_mask = np.zeros((m, p), dtype=bool)
+	self_mask[np.arange(m), nodes] = True
+
+	path = []
+	active = np.zeros(p, dtype=bool)
+	for lambda_ in lambdas:
+		# each round fits the active set, then adds the coordinates that violate the KKT
+		# conditions; every round gets its own sweep budget, so a slow round cannot keep
+		# violating coordinates out of the model
+		for _ in range(max_iter):
+			# cycle over the active coordinates until converged
+			for _ in range(max_iter):
+				max_change = 0
+				for k in np.flatnonzero(active):
+					z = C[:,k] - G[:,k] + diag[k] * B[:,k]
+					b = np.sign(z) * np.maximum(np.abs(z) - lambda_, 0) / diag[k]
+					if own[k] >= 0:
+						b[own[k]] = 0
+					delta = b - B[:,k]
+					changed = np.flatnonzero(delta)
+					if changed.size:
+						G[changed] += np.outer(delta[changed], S[k])
+						B[changed,k] = b[changed]
+						max_change = max(max_change, np.abs(delta[changed]).max())
+				if max_change < tol:
+					break
+			# KKT check for the inactive coordinates
+			violations = (np.abs(C - G) > lambda_) & (B == 0) & ~self_mask
+			new_active = violations.any(axis=0) & ~active
+			if not new_active.any():
+				break
+			active |= new_active
+		rows, cols = np.nonzero(B)
+		path.append((nodes[rows], cols))
+	return path
+
+#----------------------------------------------------------------
+# Graphical lasso
+#----------------------------------------------------------------
+# graphs along the path and, per lambda, whether scikit-learn converged
+def _glasso_path(S, lambdas, tol=1e-4, max_iter=1000):
+	p = S.shape[0]
+	path = []
+	converged = []
+	for lambda_ in lambdas:
+		# penalizing S + lambda * I off the diagonal is equivalent to huge's penalty on the full precision matrix
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always', ConvergenceWarning)
+			_, precision = graphical_lasso(S + lambda_ * np.eye(p), alpha=lambda_, tol=tol, max_iter=max_iter)
+		converged.append(not any(issubclass(w.category, ConvergenceWarning) for w in caught))
+		for w in caught:
+			if not issubclass(w.category, ConvergenceWarning):
+				warnings.warn(w.message, w.category)
+		rows, cols = np.nonzero(precision)
+		off_diagonal = rows != cols
+		path.append(SparseAdjacency.from_edges(rows[off_diagonal], cols[off_diagonal], p))
+	return path, converged
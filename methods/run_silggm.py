@@ -16,21 +16,21 @@ import time
 import numpy as np
 
 import rpy2.robjects as robjects
-from rpy2.robjects.packages import importr
-from rpy2.robjects import FloatVector, numpy2ri
-from rpy2.robjects.conversion import localconverter
+from rpy2.robjects import FloatVector
 
-# import R package
-huge = importr('huge')
-silggm = importr('SILGGM')
+from .adjacency import SparseAdjacency
+from .r_data import get_r_data, r_nonzero
+from .r_packages import load_package
 
 def run_silggm(X, method, **silggm_args):
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		X_r = robjects.conversion.py2rpy(X)
+	silggm = load_package('SILGGM')
+	data = get_r_data(X)
+	X_r = data.matrix
 
 	# Apply nonparanormal transformation if requested
 	apply_npn = silggm_args.pop('apply_npn', False)
 	if apply_npn:
+		load_package('huge')
 		npn = robjects.r['huge.npn']
 		X_r = npn(X_r, verbose=False)
 
@@ -57,10 +57,7 @@ def run_silggm(X, method, **silggm_args):
 
 	adjacency_matrix = {}
 	for alpha, mat in zip(alphas, global_decision):
-		A = robjects.r['as.matrix'](mat)
-		with localconverter(robjects.default_converter + numpy2ri.converter):
-			A_numpy = np.array(A)
-		adjacency_matrix[float(alpha)] = (A_numpy != 0).astype(int)
+		adjacency_matrix[float(alpha)] = SparseAdjacency.from_edges(*r_nonzero(mat), data.p)
 	if len(alphas) == 1:
 		adjacency_matrix = adjacency_matrix[alphas[0]]
 
@@ -0,0 +1,82 @@
+# Column schema of a data matrix
+"""
+run_mgm needs the type (Gaussian 'g' or categorical 'c') and number of levels of every
+column, and the data loaders check columns for constancy and repeated values. infer_schema
+computes all of this in one pass: the columns are sorted once, and the numbers of distinct
+values and the shortest and longest runs of equal values are read off the sorted matrix
+without a Python loop over columns. NaN counts as a single value, as in np.unique.
+"""
+
+import numpy as np
+
+def infer_schema(X, cat_threshold=10, columns=None):
+	"""
+	Infer the type, number of levels and constancy of every column of X.
+
+	Parameters
+	--------------------------------
+	X : numpy.ndarray
+		Data matrix of shape (n, p).
+	cat_threshold : int
+		Columns with at most this many distinct values, each observed at least twice, are categorical.
+	columns : list of str, optional
+		Column names, stored so the schema can be subset by name with select_columns.
+
+	Returns
+	--------------------------------
+	schema : dict
+		'n_unique', 'min_count', 'max_count' (count of the rarest and most frequent value),
+		'constant', 'type' and 'level' (the mgm type and level arguments), each with one entry
+		per column, plus 'cat_threshold' and 'columns'.
+	"""
+	X = np.asarray(X, dtype=float)
+	n, p = X.shape
+	S = np.sort(X, axis=0)
+
+	# a run of equal values starts at row 0 and wherever the sorted value changes
+	starts = np.ones((p, n + 1), dtype=bool)
+	starts[:,1:n] = ((S[1:] != S[:-1]) & ~(np.isnan(S[1:]) & np.isnan(S[:-1]))).T
+	flat = np.flatnonzero(starts)
+	col, pos = np.divmod(flat, n + 1)
+	same_col = col[1:] == col[:-1]
+	run_col = col[:-1][same_col]
+	run_length = np.diff(pos)[same_col]
+
+	n_unique = np.bincount(run_col, minlength=p)
+	min_count = np.full(p, n)
+	np.minimum.at(min_count, run_col, run_length)
+	max_count = np.zeros(p, dtype=int)
+	np.maximum.at(max_count, run_col, run_length)
+
+	schema = {
+		'n_unique': n_unique,
+		'min_count': min_count,
+		'max_count': max_count,
+		'constant': n_unique <= 1,
+		'columns': None if columns is None else list(columns)
+	}
+	schema.update(column_types(schema, cat_threshold))
+	return schema
+
+def column_types(schema, cat_threshold):
+	"""mgm types and levels for a given cat_threshold, derived from the counts in a schema."""
+	n_unique, min_count = schema['n_unique'], schema['min_count']
+	# categorical only if every category has more than one observation; constant columns stay Gaussian
+	categorical = (n_unique > 1) & (n_unique <= cat_threshold) & (min_count >= 2)
+	return {
+		'type': np.where(categorical, 'c', 'g'),
+		'level': np.where(categorical, n_unique, 1),
+		'cat_threshold': cat_threshold
+	}
+
+def select_columns(schema, columns):
+	"""Schema restricted to columns, given as names (if the schema has names) or indices."""
+	if schema['columns'] is not None and len(columns) and isinstance(columns[0], str):
+		position = {name: i for i, name in enumerate(schema['columns'])}
+		idx = np.array([position[name] for name in columns])
+	else:
+		idx = np.asarray(columns, dtype=int)
+	out = {key: value[idx] for key, value in schema.items() if isinstance(value, np.ndarray)}
+	out['cat_threshold'] = schema['cat_threshold']
+	out['columns'] = None if schema['columns'] is None else [schema['columns'][i] for i in idx]
+	return out
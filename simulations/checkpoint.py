@@ -0,0 +1,82 @@
+# Crash-safe checkpoints for simulation sweeps
+"""
+The simulation drivers used to keep all result records in memory and write a single
+pickle at the end, so a crash lost the whole sweep. Checkpoint appends the records of
+every finished (seed, method) task to a JSON lines file and flushes them to disk
+immediately. A restarted driver reads the file back and skips tasks that are already
+recorded. A line cut off by a crash is dropped, and a task with missing radii is rerun.
+
+The checkpoint is tied to its path only. Drivers derive the path from their file_name,
+so delete the file to start a sweep over with changed settings.
+"""
+
+import json
+import os
+
+import numpy as np
+
+def _to_builtin(value):
+	if isinstance(value, np.generic):
+		return value.item()
+	raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def normalize(record):
+	"""Record as it reads back from a checkpoint (numpy scalars become Python numbers)."""
+	return json.loads(json.dumps(record, default=_to_builtin))
+
+class Checkpoint:
+	"""
+	Append-only record store for (seed, method) tasks.
+
+	Parameters
+	--------------------------------
+	path : str or Path
+		JSON lines file; created if it does not exist.
+	radii : list of int
+		Radii recorded per task; a task is complete once a record exists for each.
+	"""
+	def __init__(self, path, radii):
+		self.path = path
+		self.radii = list(radii)
+		self._records = {}
+		if os.path.exists(path):
+			with open(path, 'rb+') as f:
+				content = f.read()
+				end = content.rfind(b'\n') + 1
+				# drop a partial last line left by an interrupted write
+				if end < len(content):
+					f.truncate(end)
+			for line in content[:end].decode().splitlines():
+				try:
+					record = json.loads(line)
+				except json.JSONDecodeError:
+					continue
+				self._records[record['seed'], record['method'], record['radius']] = record
+		else:
+			os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+	def __len__(self):
+		return len(self._records)
+
+	def done(self, seed, method):
+		return all((_key(seed), method, _key(radius)) in self._records for radius in self.radii)
+
+	def records(self, seed, method):
+		"""Recorded rows of a completed task, in the order of radii."""
+		return [self._records[_key(seed), method, _key(radius)] for radius in self.radii]
+
+	def append(self, records):
+		"""Write the records of a finished task to disk before returning."""
+		lines = []
+		for record in records:
+			record = normalize(record)
+			self._records[record['seed'], record['method'], record['radius']] = record
+			lines.append(json.dumps(record) + '\n')
+		with open(self.path, 'a') as f:
+			f.writelines(lines)
+			f.flush()
+			os.fsync(f.fileno())
+
+# keys are stored as JSON numbers
+def _key(value):
+	return value.item() if isinstance(value, np.generic) else value
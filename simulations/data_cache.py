@@ -0,0 +1,116 @@
+# Content-addressed cache of simulated datasets
+"""
+The simulation drivers regenerate block_graph data for every seed, although sweeps often
+repeat the same (settings, seed) pairs. cached_block_graph stores X, A and target_features
+as .npy files in a directory named by a hash of the block_graph arguments (defaults
+included) and seed, and loads them memory-mapped and read-only, so repeated and parallel
+runs share one copy on disk. Copy the arrays before modifying them in place.
+
+block_graph seeds the global numpy random state and later code (nonlinear targets, pfs)
+keeps drawing from it. The cache therefore also stores the random state that followed
+generation and restores it on a hit, so cached and fresh runs give identical results.
+Calls with an explicit rng (numpy.random.Generator) are keyed by the state of the generator
+instead, and a hit advances the generator to the state that followed generation.
+Bump CACHE_VERSION when block_graph changes what a seed generates.
+
+Example:
+	data = cached_block_graph(n, lmin, lmax, block_sizes, block_degree, block_magnitude,
+		connector_degree, connector_magnitude, random_seed=random_seed)
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from simulate_block import block_graph
+
+CACHE_VERSION = 1
+CACHE_DIR = Path(__file__).parent / 'data_cache'
+
+ARRAYS = ('X', 'A', 'target_features')
+
+def _jsonable(value):
+	if isinstance(value, np.random.Generator):
+		return value.bit_generator.state
+	if isinstance(value, (np.ndarray, np.generic, list, tuple)):
+		return np.asarray(value).tolist()
+	return value
+
+def dataset_key(params):
+	"""Hash of the block_graph arguments (with defaults applied) and the cache version."""
+	params = {name: _jsonable(value) for name, value in params.items()}
+	payload = json.dumps({'version': CACHE_VERSION, 'params': params}, sort_keys=True)
+	return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def cached_block_graph(*args, cache_dir=None, **kwargs):
+	"""
+	block_graph with an on-disk cache; takes the same arguments.
+
+	Parameters
+	--------------------------------
+	cache_dir : str or Path, optional
+		Cache directory (default: simulations/data_cache).
+
+	Returns
+	--------------------------------
+	data : dict
+		The block_graph output with X, A and target_features as read-only memory maps, plus
+		'cache_key'. Calls without a random_seed or rng are not cached.
+	"""
+	bound = inspect.signature(block_graph).bind(*args, **kwargs)
+	bound.apply_defaults()
+	params = dict(bound.arguments)
+	if params['random_seed'] is None and params['rng'] is None:
+		return block_graph(**params)
+
+	cache_dir = Path(cache_dir or CACHE_DIR)
+	key = dataset_key(params)
+	path = cache_dir / key
+	if not (path / 'meta.json').exists():
+		# record the arguments as keyed, before block_graph advances the generator
+		stored_params = {name: _jsonable(value) for name, value in params.items()}
+		_store(block_graph(**params), stored_params, params['rng'], path)
+	return _load(path, key, params['rng'])
+
+def _store(data, params, rng, path):
+	path.parent.mkdir(parents=True, exist_ok=True)
+	kind, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+	# write to a private directory and rename it into place, so readers never see a partial entry
+	tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=f'.{path.name}-'))
+	for name in ARRAYS:
+		np.save(tmp / f'{name}.npy', np.asarray(data[name]))
+	np.save(tmp / 'random_keys.npy', keys)
+	meta = {
+		'params': params,
+		'feature_names': data['feature_names'],
+		'max_cor_response': _jsonable(data['max_cor_response']),
+		'random_state': [kind, int(pos), int(has_gauss), float(cached_gaussian)],
+		'rng_state': None if rng is None else rng.bit_generator.state
+	}
+	with open(tmp / 'meta.json', 'w') as f:
+		json.dump(meta, f)
+	try:
+		os.rename(tmp, path)
+	except OSError:
+		# another process stored the same dataset first
+		shutil.rmtree(tmp, ignore_errors=True)
+
+def _load(path, key, rng=None):
+	with open(path / 'meta.json') as f:
+		meta = json.load(f)
+	data = {name: np.load(path / f'{name}.npy', mmap_mode='r') for name in ARRAYS}
+	if rng is None:
+		kind, pos, has_gauss, cached_gaussian = meta['random_state']
+		np.random.set_state((kind, np.load(path / 'random_keys.npy'), pos, has_gauss, cached_gaussian))
+	else:
+		rng.bit_generator.state = meta['rng_state']
+	data['feature_names'] = meta['feature_names']
+	data['max_cor_response'] = meta['max_cor_response']
+	data['cache_key'] = key
+	return data
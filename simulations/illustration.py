@@ -3,7 +3,7 @@
 import pickle
 import sys
 
-from localgraph import pfs, plot_graph, restrict_to_local_graph, tp_and_fp
+from localgraph import pfs, plot_graph
 import matplotlib.patches as patches
 import matplotlib.pyplot as plt
 import numpy as np
@@ -11,8 +11,9 @@ import numpy as np
 from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR.parent))
-from methods import run_method
-from simulate_block import block_graph
+from data_cache import cached_block_graph
+from methods import EdgeTable, run_method
+from utils import restrict_to_local_graph, tp_and_fp
 
 #--------------------------------
 # Settings
@@ -74,8 +75,8 @@ plot_args = {'node_size': 1000, 'font_size': 14, 'edge_font_size': 9, 'edge_widt
 #--------------------------------
 # Main
 #--------------------------------
-# Generate data
-data = block_graph(
+# Generate data (cached in simulations/data_cache, see data_cache.py)
+data = cached_block_graph(
 	n=n, 
 	lmin=lmin, 
 	lmax=lmax, 
@@ -124,20 +125,14 @@ method_configs = {
 	}
 }
 
-# Convert PFS output to matrix
-def dict_to_matrix(graph_dict, p):
-	A = np.zeros((p, p))
-	for (i,j), q in graph_dict.items():
-		A[i,j] = q
-		A[j,i] = q
-	return A
-
 def run_all_methods(method_name, X, **kwargs):
 	if method_name == 'pfs':
 		Q = pfs(X, **kwargs)
-		return dict_to_matrix(Q,p)
+		# dense matrix of q-values for plotting
+		return EdgeTable.from_dict(Q, p).toarray()
 	else:
-		return run_method(method_name, X, **kwargs)['adjacency_matrix']
+		# dense view for plotting
+		return np.asarray(run_method(method_name, X, **kwargs)['adjacency_matrix'])
 
 # Run all methods
 results = {}
@@ -0,0 +1,69 @@
+# Compare the q-values of the R and NumPy knockoff backends
+
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy.stats import spearmanr
+from sklearn.preprocessing import StandardScaler
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR.parent))
+from data_cache import cached_block_graph
+from default_settings import default_settings
+from knockoffs import GaussianKnockoffs, knockoff_qvalues_numpy
+from qvalue_methods import _load_knockoff, knockoff_qvalues
+
+#----------------------------------------------------------------
+# Settings
+#----------------------------------------------------------------
+setting = 'linear_sparse_n100'
+random_seeds = [1, 2, 3]
+n_repeats = 20 # knockoff draws per backend; q-values are compared through their averages
+stats = ['glmnet_coefdiff', 'random_forest']
+fdr_levels = [0.1, 0.2]
+alpha_list = np.linspace(0.01, 0.5, 200)
+
+#----------------------------------------------------------------
+# Run comparison
+#----------------------------------------------------------------
+# both backends see the design and response of one pfs call (the first target against all
+# other features). Each backend is summarized by the mean q-value and the selection
+# frequency of every feature over n_repeats knockoff draws.
+def summarize(qvalue_method, X, y, **kwargs):
+	q = np.array([list(qvalue_method(X, y, alpha_list, **kwargs)['q_values'].values()) for _ in range(n_repeats)])
+	return q.mean(axis=0), {fdr: (q <= fdr).mean(axis=0) for fdr in fdr_levels}
+
+def equicorrelated_vs_asdp(sampler, X):
+	"""Mean knockoff gap s of the NumPy sampler and of R's approximate SDP on the same correlation matrix."""
+	import rpy2.robjects as robjects
+	from rpy2.robjects import numpy2ri
+	from rpy2.robjects.conversion import localconverter
+	_load_knockoff()
+	corr = np.linalg.inv(sampler.parameters()[2])
+	with localconverter(robjects.default_converter + numpy2ri.converter):
+		s_asdp = np.asarray(robjects.r['create.solve_asdp'](corr))
+	return sampler.s, s_asdp.mean()
+
+cfg = default_settings[setting]
+for random_seed in random_seeds:
+	np.random.seed(random_seed)
+	data = cached_block_graph(cfg['n'], cfg['lmin'], cfg['lmax'], cfg['block_sizes'], cfg['block_degree'],
+		cfg['block_magnitude'], cfg['connector_degree'], cfg['connector_magnitude'], random_seed=random_seed)
+	X_full = StandardScaler().fit_transform(data['X'])
+	target = data['target_features'][0]
+	X, y = np.delete(X_full, target, axis=1), X_full[:,target]
+	sampler = GaussianKnockoffs(X_full)
+
+	s_numpy, s_asdp = equicorrelated_vs_asdp(sampler, X_full)
+	print(f'seed {random_seed}, target {target} (shrinkage: {sampler.shrink})')
+	print(f'--------------------------------')
+	print(f'knockoff gap s: equicorrelated {s_numpy:.3f}, R asdp (mean) {s_asdp:.3f}')
+	for stat in stats:
+		q_R, freq_R = summarize(knockoff_qvalues, X, y, stat=stat)
+		q_numpy, freq_numpy = summarize(knockoff_qvalues_numpy, X, y, stat=stat, sampler=sampler)
+		print(f'{stat}: spearman of mean q-values {spearmanr(q_R, q_numpy)[0]:.2f}')
+		for fdr in fdr_levels:
+			print(f'  fdr {fdr}: mean selections R {freq_R[fdr].sum():.2f}, numpy {freq_numpy[fdr].sum():.2f}; '
+				f'mean |difference in selection frequency| {np.abs(freq_R[fdr] - freq_numpy[fdr]).mean():.3f}')
+	print()
@@ -0,0 +1,63 @@
+# Per-call overhead of knockoff_qvalues
+
+import time
+
+import numpy as np
+import rpy2.robjects as robjects
+from rpy2.robjects import numpy2ri
+from rpy2.robjects.conversion import localconverter
+
+from qvalue_methods import knockoff_filter, to_r_buffer
+
+#----------------------------------------------------------------
+# Settings
+#----------------------------------------------------------------
+n_calls = 50
+n, p = 200, 50
+stat = 'glmnet_coefdiff'
+alpha_list = [0.05, 0.1, 0.2]
+random_seed = 302
+
+#----------------------------------------------------------------
+# Setup paths
+#----------------------------------------------------------------
+# former path: parse and evaluate the R source (library call included) and convert every argument on each call
+def setup_legacy(X, y):
+	robjects.r(f"""
+	suppressMessages({{library(knockoff)}})
+	run_knockoff_filter <- function(X, y, alpha_list, mu, Sigma) {{
+		k_stat = function(X, Xk, y) stat.{stat}(X, Xk, y, nfolds=5)
+		result = knockoff.filter(X, y, knockoffs=function(X) create.second_order(X), statistic=k_stat, fdr=alpha_list[1])
+		return(result$statistic)
+	}}
+	""")
+	with localconverter(robjects.default_converter + numpy2ri.converter):
+		X_r = robjects.conversion.py2rpy(X)
+		y_r = robjects.conversion.py2rpy(y)
+	return robjects.globalenv['run_knockoff_filter'], X_r, y_r, robjects.FloatVector(alpha_list)
+
+# current path: cached closure, X and y copied into reused R buffers
+def setup_cached(X, y):
+	return knockoff_filter(stat), to_r_buffer('X', X), to_r_buffer('y', y), robjects.FloatVector(alpha_list)
+
+#----------------------------------------------------------------
+# Run benchmark
+#----------------------------------------------------------------
+# only the setup before the filter runs is timed; the filter itself is the same R code in both paths
+rng = np.random.default_rng(random_seed)
+datasets = [(rng.standard_normal((n, p)), rng.standard_normal(n)) for _ in range(n_calls)]
+
+times = {}
+for name, setup in [('legacy', setup_legacy), ('cached', setup_cached)]:
+	setup(*datasets[0])
+	times[name] = []
+	for X, y in datasets:
+		start = time.perf_counter()
+		setup(X, y)
+		times[name].append(time.perf_counter() - start)
+
+print(f'Per-call overhead of knockoff_qvalues (n = {n}, p = {p}, {n_calls} calls)')
+print(f'--------------------------------')
+for name, t in times.items():
+	print(f'{name}: {1000 * np.mean(t):.2f} ms (min {1000 * np.min(t):.2f})')
+print(f'speed-up: {np.mean(times["legacy"]) / np.mean(times["cached"]):.1f}x')
@@ -0,0 +1,224 @@
+# NumPy Gaussian knockoffs for PFS
+"""
+knockoff_qvalues calls the R knockoff package, whose create.second_order estimates a shrunk
+covariance and solves for the knockoff parameters on every call. PFS calls its q-value
+method once per frontier node with X minus one column, so these steps are repeated on
+nearly the same data. GaussianKnockoffs estimates the covariance and its inverse once per
+dataset. The precision matrix of X minus column c then follows from the full one by a
+rank-one Schur complement update, and only the knockoff covariance is factored per call.
+The removed column is found by hashing y, which PFS passes as that column.
+
+The covariance is estimated as create.second_order does: the sample covariance, or the
+Schafer-Strimmer shrinkage estimate of corpcor's cov.shrink when the sample covariance is
+not positive definite. R applies the shrinkage to each design, so its shrinkage intensity
+can differ slightly from the one estimated on the full data here.
+
+The result is not identical to the R backend:
+- knockoffs are equicorrelated, with s = min(1, 2 * lambda_min) taken from the full
+  correlation matrix (valid for every submatrix by eigenvalue interlacing), while R
+  solves the approximate SDP by default, which gives larger s and more power;
+- the statistics are computed with scikit-learn (LassoCV instead of cv.glmnet, random
+  forest impurity importances instead of ranger).
+The q-values use knockoff+ thresholds as knockoff.threshold does. knockoff_backends.py
+compares the q-values of both backends. Draws come from the global numpy random state
+unless random_state is given.
+
+Example:
+	sampler = GaussianKnockoffs(X)
+	result = knockoff_qvalues_numpy(np.delete(X, 0, axis=1), X[:,0], alpha_list, sampler=sampler)
+"""
+
+import hashlib
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LassoCV
+
+#----------------------------------------------------------------
+# Covariance estimation
+#----------------------------------------------------------------
+def cov_shrink(X):
+	"""
+	Schafer-Strimmer shrinkage estimate of the covariance (corpcor's cov.shrink): the
+	correlations are shrunk towards zero and the variances towards their median, each with
+	an intensity estimated from the data.
+
+	Returns
+	--------------------------------
+	corr : numpy.ndarray
+		Shrunk correlation matrix.
+	scale : numpy.ndarray
+		Shrunk standard deviations.
+	"""
+	X = np.asarray(X, dtype=float)
+	n, p = X.shape
+	Xc = X - X.mean(axis=0)
+	W = Xc**2
+	v = W.sum(axis=0) / (n - 1)
+	Z = Xc / np.sqrt(v)
+	r = Z.T @ Z / (n - 1)
+	# estimated variance of each sample correlation, relative to the squared correlations
+	Z2 = Z**2
+	var_r = n / (n - 1)**3 * (Z2.T @ Z2 - n * (Z.T @ Z / n)**2)
+	off = ~np.eye(p, dtype=bool)
+	lambda_corr = np.clip(var_r[off].sum() / max((r[off]**2).sum(), np.finfo(float).tiny), 0, 1)
+	corr = (1 - lambda_corr) * r
+	np.fill_diagonal(corr, 1)
+	var_v = n / (n - 1)**3 * ((W - W.mean(axis=0))**2).sum(axis=0)
+	target = np.median(v)
+	lambda_var = np.clip(var_v.sum() / max(((v - target)**2).sum(), np.finfo(float).tiny), 0, 1)
+	scale = np.sqrt(lambda_var * target + (1 - lambda_var) * v)
+	return corr, scale
+
+#----------------------------------------------------------------
+# Knockoff sampler
+#----------------------------------------------------------------
+def _column_hash(x):
+	return hashlib.sha1(np.ascontiguousarray(x, dtype=float).tobytes()).hexdigest()
+
+class GaussianKnockoffs:
+	"""
+	Second-order Gaussian knockoffs for a dataset and any of its leave-one-column-out designs.
+
+	Parameters
+	--------------------------------
+	X : numpy.ndarray
+		Data matrix of shape (n, p).
+	shrink : bool
+		Always use the shrinkage estimate (as create.second_order with shrink=TRUE).
+	"""
+	def __init__(self, X, shrink=False):
+		X = np.asarray(X, dtype=float)
+		self.p = X.shape[1]
+		self.mu = X.mean(axis=0)
+		if not shrink:
+			Sigma = np.cov(X, rowvar=False)
+			# the positive definiteness test of the knockoff package
+			shrink = np.linalg.eigvalsh(Sigma)[0] <= 1e-8
+		if shrink:
+			corr, self.scale = cov_shrink(X)
+		else:
+			self.scale = np.sqrt(np.diag(Sigma))
+			corr = Sigma / np.outer(self.scale, self.scale)
+		self.shrink = shrink
+		self.precision = np.linalg.inv(corr)
+		self.s = min(1.0, 2 * np.linalg.eigvalsh(corr)[0])
+		self._columns = {_column_hash(X[:,j]): j for j in range(self.p)}
+
+	def column(self, y):
+		"""Index of the column of X equal to y, or None."""
+		return self._columns.get(_column_hash(y))
+
+	def parameters(self, c=None):
+		"""Mean, scale and correlation precision matrix of X without column c (all of X if None)."""
+		if c is None:
+			return self.mu, self.scale, self.precision
+		keep = np.arange(self.p) != c
+		P = self.precision
+		# Schur complement: inverse of the correlation submatrix from the full inverse
+		precision = P[np.ix_(keep, keep)] - np.outer(P[keep, c], P[c, keep]) / P[c, c]
+		return self.mu[keep], self.scale[keep], precision
+
+	def sample(self, X, c=None, rng=None):
+		"""Knockoff copy of X, which is the data without column c (all of the data if c is None)."""
+		rng = np.random.default_rng(rng)
+		mu, scale, precision = self.parameters(c)
+		s = self.s
+		Z = (np.asarray(X, dtype=float) - mu) / scale
+		# conditional law of the knockoffs: mean Z (I - s P), covariance 2 s I - s^2 P
+		mean = Z - s * Z @ precision
+		cov = 2 * s * np.eye(len(mu)) - s**2 * precision
+		w, U = np.linalg.eigh(cov)
+		root = U * np.sqrt(np.maximum(w, 0))
+		Zk = mean + rng.standard_normal(Z.shape) @ root.T
+		return mu + Zk * scale
+
+#----------------------------------------------------------------
+# Statistics and thresholds
+#----------------------------------------------------------------
+def _swap(X, Xk, rng):
+	# randomly swap originals and knockoffs so the fit cannot favor either column order
+	swap = rng.random(X.shape[1]) < 0.5
+	return np.where(swap, Xk, X), np.where(swap, X, Xk), 1 - 2 * swap
+
+def lasso_coefdiff(X, Xk, y, rng, nfolds=5):
+	"""Difference of absolute cross-validated lasso coefficients of originals and knockoffs."""
+	X1, X2, sign = _swap(X, Xk, rng)
+	p = X.shape[1]
+	coef = LassoCV(cv=nfolds, max_iter=10000).fit(np.hstack([X1, X2]), y).coef_
+	return (np.abs(coef[:p]) - np.abs(coef[p:])) * sign
+
+def random_forest(X, Xk, y, rng, n_estimators=500):
+	"""Difference of random forest impurity importances of originals and knockoffs."""
+	X1, X2, sign = _swap(X, Xk, rng)
+	p = X.shape[1]
+	forest = RandomForestRegressor(n_estimators=n_estimators, random_state=rng.integers(2**31))
+	importance = forest.fit(np.hstack([X1, X2]), y).feature_importances_
+	return (importance[:p] - importance[p:]) * sign
+
+# statistic names of the R package; glmnet_coefdiff and lasso_coefdiff both fit a cross-validated lasso
+statistics = {'glmnet_coefdiff': lasso_coefdiff, 'lasso_coefdiff': lasso_coefdiff, 'random_forest': random_forest}
+
+def threshold_qvalues(W, alpha_list):
+	"""
+	Smallest alpha in alpha_list at which each feature is selected by the knockoff+ threshold
+	(1 if never), as the loop over knockoff.threshold in knockoff_qvalues.
+	"""
+	W = np.asarray(W, dtype=float)
+	alphas = np.sort(np.asarray(alpha_list, dtype=float))
+	ts = np.unique(np.concatenate([[0], np.abs(W)]))
+	W_sorted = np.sort(W)
+	n_neg = np.searchsorted(W_sorted, -ts, side='right')
+	n_pos = W.size - np.searchsorted(W_sorted, ts, side='left')
+	ratio = (1 + n_neg) / np.maximum(1, n_pos)
+	# W_j >= T(alpha) iff some threshold t <= W_j has ratio(t) <= alpha
+	best = np.minimum.accumulate(ratio)
+	position = np.searchsorted(ts, W, side='right') - 1
+	reachable = np.where(position >= 0, best[np.maximum(position, 0)], np.inf)
+	k = np.searchsorted(alphas, reachable, side='left')
+	qvals = np.ones(W.size)
+	found = k < alphas.size
+	qvals[found] = np.minimum(alphas[k[found]], 1)
+	return qvals
+
+#----------------------------------------------------------------
+# q-values
+#----------------------------------------------------------------
+def knockoff_qvalues_numpy(X, y, alpha_list, stat='glmnet_coefdiff', sampler=None, random_state=None):
+	"""
+	Drop-in replacement for knockoff_qvalues with second-order Gaussian knockoffs, without R.
+
+	Parameters
+	--------------------------------
+	X : numpy.ndarray
+		Design matrix of shape (n, p).
+	y : numpy.ndarray
+		Response of length n.
+	alpha_list : list of float
+		Target FDR levels; each feature gets the smallest level at which it is selected.
+	stat : str
+		'glmnet_coefdiff', 'lasso_coefdiff' or 'random_forest'.
+	sampler : GaussianKnockoffs, optional
+		Sampler fitted to the full data. If y is one of its columns and X the remaining
+		columns, its covariance estimate is reused; otherwise a sampler is fitted to X.
+	random_state : int or numpy.random.Generator, optional
+		Source of the knockoffs and column swaps. If None, a seed is drawn from the global
+		numpy random state.
+
+	Returns
+	--------------------------------
+	output : dict
+		'q_values': {feature index: q-value}, as knockoff_qvalues.
+	"""
+	if stat not in statistics:
+		raise ValueError(f'Unsupported knockoff statistic: {stat}')
+	rng = np.random.default_rng(np.random.randint(2**32) if random_state is None else random_state)
+	X = np.asarray(X, dtype=float)
+	c = None if sampler is None else sampler.column(y)
+	if c is None or sampler.p != X.shape[1] + 1:
+		sampler, c = GaussianKnockoffs(X), None
+	Xk = sampler.sample(X, c, rng)
+	W = statistics[stat](X, Xk, y, rng)
+	qvals = threshold_qvalues(W, alpha_list)
+
+	return {'q_values': {j: qvals[j] for j in range(len(qvals))}}
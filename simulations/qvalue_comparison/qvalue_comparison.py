@@ -4,15 +4,22 @@ import logging
 import pickle
 import time
 
-from localgraph import pfs, tp_and_fp
+from localgraph import pfs
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
 import sys, os
 sys.path.insert(0, os.path.abspath('..'))
+sys.path.insert(0, os.path.abspath('../..'))
+from checkpoint import Checkpoint, normalize
+from data_cache import cached_block_graph
 from simulate_block import block_graph
+from trials import trial_streams
+from knockoffs import GaussianKnockoffs, knockoff_qvalues_numpy
 from qvalue_methods import knockoff_qvalues, padjust
+from methods import EdgeTable
+from utils import LocalGraphEvaluator
 
 #----------------------------------------------------------------
 # Global settings
@@ -31,6 +38,16 @@ default_settings = True
 ################################
 n = 100
 ################################
+use_checkpoint = save_results # append finished (seed, method) results to <file_name>.jsonl and skip them on restart
+################################
+use_data_cache = True # load datasets from simulations/data_cache (see data_cache.py)
+################################
+knockoff_backend = 'R' # 'R': knockoff package; 'numpy': Gaussian knockoffs fitted once per dataset, not identical to R (see knockoffs.py)
+################################
+use_rng_streams = False # data and methods draw from per-trial generators from SeedSequence(seed).spawn (see trials.py); False reproduces the published global-seed results
+################################
+independent_methods = False # start every method from the random state after data generation (True), or continue the stream from method to method (False, as the published results)
+################################
 
 # random seed list
 random_seed_list = np.arange(1,101)
@@ -75,19 +92,19 @@ file_name = f'{file_name}_' + '_'.join(methods)
 simulation_metadata = {'n':n, 'p':p, 'snr':snr, 'block_sizes':block_sizes, 'block_degree':block_degree, 'connector_degree':connector_degree,
 'block_magnitude':block_magnitude, 'connector_magnitude':connector_magnitude, 'lmin':lmin, 'lmax':lmax, 
 'random_seed_list':random_seed_list.tolist(), 'radii':radii, 'methods':methods, 'qpath_max':qpath_max, 'fdr_local':fdr_local,
-'do_nonlinear':do_nonlinear}
+'do_nonlinear':do_nonlinear, 'use_rng_streams':use_rng_streams, 'independent_methods':independent_methods}
 
 # store results
 all_results = []
 
 # create nonlinear target if do_nonlinear is True
-def nonlinear_target(X, A_true, target, neighbors, snr):
+def nonlinear_target(X, A_true, target, neighbors, snr, rng=None):
 	signal = np.zeros(X.shape[0])
 	for i in neighbors:
 		signal += np.exp(-X[:,i]**2 / 2)
 		A_true[target,i] = A_true[i,target] = 1
 	sigma2 = np.var(signal) / snr
-	X[:,target] = signal + np.random.normal(0, np.sqrt(sigma2), size=n) 
+	X[:,target] = signal + (np.random if rng is None else rng).normal(0, np.sqrt(sigma2), size=n) 
 	# add edges between neighbors of target
 	for i in neighbors:
 		for j in neighbors:
@@ -95,21 +112,13 @@ def nonlinear_target(X, A_true, target, neighbors, snr):
 				A_true[i,j] = A_true[j,i] = 1
 	return X, A_true
 
-# convert dictionary of q-values to adjacency matrix
-def dict_to_matrix(graph_dict, p):
-	Q = graph_dict
-	A = np.zeros((p,p))
-	for (i,j), q in Q.items():
-		A[i,j] = q
-		A[j,i] = q
-	return A
-
 #----------------------------------------------------------------
 # Method configurations
 #----------------------------------------------------------------
 alpha_list = np.linspace(0.01, 0.5, 200)
 criterion = 'forward'
 verbose = False
+knockoff_method = knockoff_qvalues_numpy if knockoff_backend == 'numpy' else knockoff_qvalues
 
 method_configs = {
 	# benjamini methods
@@ -118,12 +127,12 @@ method_configs = {
 	'pfs_by':{'qvalue_method':padjust, 'method_args':{'method':'by'}, 'qpath_max':qpath_max, 'max_radius':max(radii), 
 		'fdr_local':fdr_local, 'criterion':criterion, 'verbose':verbose},
 
-	# knockoffs (R package)
-	'pfs_koglm':{'qvalue_method':knockoff_qvalues, 'method_args':{'alpha_list':alpha_list, 'stat':'glmnet_coefdiff'}, 
+	# knockoffs (R package or NumPy, see knockoff_backend)
+	'pfs_koglm':{'qvalue_method':knockoff_method, 'method_args':{'alpha_list':alpha_list, 'stat':'glmnet_coefdiff'}, 
 		'qpath_max':qpath_max, 'max_radius':max(radii), 'fdr_local':fdr_local, 'criterion':criterion, 'verbose':verbose},
-	'pfs_kol1':{'qvalue_method':knockoff_qvalues, 'method_args':{'alpha_list':alpha_list, 'stat':'lasso_coefdiff'}, 
+	'pfs_kol1':{'qvalue_method':knockoff_method, 'method_args':{'alpha_list':alpha_list, 'stat':'lasso_coefdiff'}, 
 		'qpath_max':qpath_max, 'max_radius':max(radii), 'fdr_local':fdr_local, 'criterion':criterion, 'verbose':verbose},
-	'pfs_korf':{'qvalue_method':knockoff_qvalues, 'method_args':{'alpha_list':alpha_list, 'stat':'random_forest'}, 
+	'pfs_korf':{'qvalue_method':knockoff_method, 'method_args':{'alpha_list':alpha_list, 'stat':'random_forest'}, 
 		'qpath_max':qpath_max, 'max_radius':max(radii), 'fdr_local':fdr_local, 'criterion':criterion, 'verbose':verbose},
 
 	# ipss methods
@@ -136,6 +145,7 @@ method_configs = {
 }
 
 simulation_metadata['method_configs'] = method_configs
+simulation_metadata['knockoff_backend'] = knockoff_backend
 
 #----------------------------------------------------------------
 # Run simulation
@@ -148,6 +158,10 @@ n_trials = len(random_seed_list)
 print(f'Starting {file_name}')
 print(f'----------------------------------------------------------------')
 
+checkpoint = Checkpoint(f'{file_name}.jsonl', radii) if use_checkpoint else None
+if checkpoint is not None and len(checkpoint):
+	logging.info(f'Resuming from {checkpoint.path} ({len(checkpoint)} records)')
+
 for trial, random_seed in enumerate(random_seed_list):
 
 	if save_results:
@@ -155,9 +169,17 @@ for trial, random_seed in enumerate(random_seed_list):
 	else:
 		print(f'trial {trial + 1}/{n_trials}')
 
-	# generate data
-	data = block_graph(n, lmin, lmax, block_sizes, block_degree, block_magnitude, 
-		connector_degree, connector_magnitude, random_seed=random_seed)
+	# reuse results recorded by an earlier run
+	if checkpoint is not None and all(checkpoint.done(random_seed, m) for m in methods):
+		for method_name in methods:
+			all_results.extend(checkpoint.records(random_seed, method_name))
+		continue
+
+	# generate data; with rng streams, the data and every method get their own generator
+	data_rng, task_seeds = trial_streams(random_seed, len(methods)) if use_rng_streams else (None, [None] * len(methods))
+	generate = cached_block_graph if use_data_cache else block_graph
+	data = generate(n, lmin, lmax, block_sizes, block_degree, block_magnitude, 
+		connector_degree, connector_magnitude, random_seed=random_seed, rng=data_rng)
 
 	# data output
 	X = data['X']
@@ -171,7 +193,8 @@ for trial, random_seed in enumerate(random_seed_list):
 
 	# apply nonlinearity; note that in this study, the target feature is always 0
 	if do_nonlinear:
-		X, A_true = nonlinear_target(X, A_true, 0, np.arange(1, block_sizes[1]+1), snr)
+		# cached arrays are read-only memory maps
+		X, A_true = nonlinear_target(np.array(X), np.array(A_true), 0, np.arange(1, block_sizes[1]+1), snr, rng=data_rng)
 
 	X = StandardScaler().fit_transform(X)		
 
@@ -179,32 +202,50 @@ for trial, random_seed in enumerate(random_seed_list):
 	for m in method_configs:
 		method_configs[m]['target_features'] = target_features
 
+	# true edges and their distances from the targets are shared by all methods of the trial
+	evaluator = LocalGraphEvaluator(A_true, target_features)
+
+	# with independent_methods, every method starts from the random state after data generation,
+	# so skipping recorded methods does not change the others. Otherwise the methods continue the
+	# stream in order, and a resumed trial matches an uninterrupted one only if none of its
+	# methods were skipped.
+	random_state = np.random.get_state()
+
 	for i, method_name in enumerate(methods):
+		if checkpoint is not None and checkpoint.done(random_seed, method_name):
+			all_results.extend(checkpoint.records(random_seed, method_name))
+			continue
+
+		if task_seeds[i] is not None:
+			# pfs draws from the global state, so it is seeded from the method's stream
+			np.random.seed(np.random.default_rng(task_seeds[i]).integers(2**32))
+		elif independent_methods:
+			np.random.set_state(random_state)
+		task_results = []
 		config = method_configs[method_name]
 		start = time.time()
 
-		Q = pfs(X, **config)
-		A = dict_to_matrix(Q,p)
+		# covariance of the knockoffs, estimated once for all frontier nodes; timed with the method
+		if knockoff_backend == 'numpy' and config.get('qvalue_method') is knockoff_method:
+			config = {**config, 'method_args':{**config['method_args'], 'sampler':GaussianKnockoffs(X)}}
 
-		A = np.maximum(A, A.T)
+		Q = pfs(X, **config)
+		A = EdgeTable.from_dict(Q, p).adjacency()
 		method_time = time.time() - start
 
 		print(f'  {method_name}: {method_time:.2f} seconds')
 
-		# true positives in the full graph
-		n_true_global = np.sum(A_true) // 2
-		tp_global, fp_global = tp_and_fp(A, A_true, target_features, radius=None)
-		tpr_global = tp_global / max(n_true_global, 1)
+		# true positives in the full graph and at every radius
+		counts = evaluator.score(A, radii)
+		tp_global, fp_global = counts['tp_global'], counts['fp_global']
+		tpr_global = tp_global / max(counts['n_true_global'], 1)
 		fdp_global = fp_global / max(tp_global + fp_global, 1)
 
 		# loop over radii
-		for radius in radii:
-
-			tp_true, _ = tp_and_fp(A_true, A_true, target_features, radius=radius)
-			n_true_local = tp_true
+		for k, radius in enumerate(radii):
 
-			tp_local, fp_local = tp_and_fp(A, A_true, target_features, radius=radius)
-			tpr_local = tp_local / max(n_true_local, 1)
+			tp_local, fp_local = int(counts['tp_local'][k]), int(counts['fp_local'][k])
+			tpr_local = tp_local / max(int(counts['n_true_local'][k]), 1)
 			fdp_local = fp_local / max(tp_local + fp_local, 1)
 
 			if tp_local > tp_global:
@@ -214,7 +255,7 @@ for trial, random_seed in enumerate(random_seed_list):
 				print(f' - tpr_local = {tpr_local}')
 
 			# save per radius
-			all_results.append({
+			task_results.append({
 				'seed': random_seed,
 				'radius': radius,
 				'method': method_name,
@@ -225,6 +266,12 @@ for trial, random_seed in enumerate(random_seed_list):
 				'time_sec': method_time
 			})
 
+		# write the finished method to disk; store records as they read back so resumed runs agree
+		if checkpoint is not None:
+			checkpoint.append(task_results)
+			task_results = [normalize(record) for record in task_results]
+		all_results.extend(task_results)
+
 #----------------------------------------------------------------
 # Save or print results summary
 #----------------------------------------------------------------
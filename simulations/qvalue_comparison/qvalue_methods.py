@@ -1,19 +1,28 @@
 # Collection of methods for computing q-values
 
+from functools import lru_cache
+
 import numpy as np
 import statsmodels.api as sm
 from statsmodels.stats.multitest import multipletests
 
-import rpy2.robjects as robjects
-from rpy2.robjects import numpy2ri
-from rpy2.robjects.conversion import localconverter
-
 
-# q-values from knockoffs (R package)
-def knockoff_qvalues(X, y, alpha_list, stat='glmnet_coefdiff', mu=None, Sigma=None):
-	knockoff_r_code = f"""
-	suppressMessages({{library(knockoff)}})
-	run_knockoff_filter <- function(X, y, alpha_list, mu, Sigma) {{
+# pfs calls the q-value method once per frontier node, so the knockoff package is loaded and
+# the R filter defined only once per process, and X and y are copied into R vectors that are
+# reused while their shapes stay the same (see knockoff_overhead.py)
+# rpy2 is imported on first use, so padjust and the NumPy knockoffs run without R
+@lru_cache(maxsize=None)
+def _load_knockoff():
+	import rpy2.robjects as robjects
+	robjects.r('suppressMessages(library(knockoff))')
+
+# R closure of the knockoff filter for one importance statistic
+@lru_cache(maxsize=None)
+def knockoff_filter(stat):
+	import rpy2.robjects as robjects
+	_load_knockoff()
+	return robjects.r(f"""
+	function(X, y, alpha_list, mu, Sigma) {{
 		if (!is.null(mu) && !is.null(Sigma)) {{
 			knockoffs = function(X) create.gaussian(X, mu, Sigma)
 		}} else {{
@@ -30,18 +39,50 @@ def knockoff_qvalues(X, y, alpha_list, stat='glmnet_coefdiff', mu=None, Sigma=No
 		}}
 		return(qvals)
 	}}
-	"""
-	X = np.asarray(X, dtype=float)
-	y = np.asarray(y, dtype=float)
-	with localconverter(robjects.default_converter + numpy2ri.converter):
-		X_r = robjects.conversion.py2rpy(X)
-		y_r = robjects.conversion.py2rpy(y)
-		mu_r = robjects.NULL if mu is None else robjects.conversion.py2rpy(mu)
-		Sigma_r = robjects.NULL if Sigma is None else robjects.conversion.py2rpy(Sigma)
-	robjects.r(knockoff_r_code)
-	run_knockoff_filter_r = robjects.globalenv['run_knockoff_filter']
-	alpha_list_r = robjects.FloatVector(alpha_list)
-	qvals_r = run_knockoff_filter_r(X_r, y_r, alpha_list_r, mu_r, Sigma_r)
+	""")
+
+@lru_cache(maxsize=None)
+def _alpha_vector(alpha_list):
+	import rpy2.robjects as robjects
+	return robjects.FloatVector(alpha_list)
+
+# reusable R vectors and matrices, keyed by argument name and shape
+max_buffers = 8
+_buffers = {}
+
+def to_r_buffer(name, values):
+	"""Copy values into the R buffer of this name and shape (created on first use) and return it."""
+	import rpy2.robjects as robjects
+	from rpy2.robjects import numpy2ri
+	from rpy2.robjects.conversion import localconverter
+	values = np.asarray(values, dtype=float)
+	if values.ndim not in (1, 2):
+		raise ValueError(f'R buffers hold vectors or matrices, got {values.ndim} dimensions')
+	key = (name, values.shape)
+	if key not in _buffers:
+		if len(_buffers) >= max_buffers:
+			_buffers.clear()
+		with localconverter(robjects.default_converter + numpy2ri.converter):
+			vector = robjects.conversion.py2rpy(values)
+		# numpy view onto the memory of the R vector; matrices are column-major, as R stores them
+		view = np.asarray(vector.memoryview())
+		if view.shape != values.shape:
+			view = view.reshape(values.shape, order='F')
+		_buffers[key] = (vector, view)
+	vector, view = _buffers[key]
+	view[...] = values
+	return vector
+
+# q-values from knockoffs (R package)
+def knockoff_qvalues(X, y, alpha_list, stat='glmnet_coefdiff', mu=None, Sigma=None):
+	import rpy2.robjects as robjects
+	from rpy2.robjects import numpy2ri
+	from rpy2.robjects.conversion import localconverter
+	X_r = to_r_buffer('X', X)
+	y_r = to_r_buffer('y', y)
+	mu_r = robjects.NULL if mu is None else to_r_buffer('mu', mu)
+	Sigma_r = robjects.NULL if Sigma is None else to_r_buffer('Sigma', Sigma)
+	qvals_r = knockoff_filter(stat)(X_r, y_r, _alpha_vector(tuple(alpha_list)), mu_r, Sigma_r)
 	with localconverter(robjects.default_converter + numpy2ri.converter):
 		qvals = np.array(qvals_r)
 	p = len(qvals)
@@ -0,0 +1,43 @@
+# Start-up cost of importing the methods package
+
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+#----------------------------------------------------------------
+# Settings
+#----------------------------------------------------------------
+n_repeats = 5
+root = os.path.abspath('../..')
+
+# the eager statement reproduces the former import-time behavior of methods
+statements = {
+	'lazy': 'import methods',
+	'eager': (
+		'import methods\n'
+		'from methods.r_packages import load_package\n'
+		'for package in ["bnlearn", "huge", "mgm", "SILGGM"]: load_package(package)\n'
+		'import methods.run_bnlearn, methods.run_huge, methods.run_mgm, methods.run_silggm'
+	),
+}
+
+#----------------------------------------------------------------
+# Run benchmark
+#----------------------------------------------------------------
+# each import is timed in a fresh interpreter so nothing is cached between repeats
+times = {}
+for name, statement in statements.items():
+	times[name] = []
+	for _ in range(n_repeats):
+		start = time.time()
+		subprocess.run([sys.executable, '-c', statement], cwd=root, check=True)
+		times[name].append(time.time() - start)
+
+print(f'Import time of methods ({n_repeats} repeats)')
+print(f'--------------------------------')
+for name, t in times.items():
+	print(f'{name}: {np.mean(t):.2f} seconds (min {np.min(t):.2f})')
+print(f'speed-up: {np.mean(times["eager"]) / np.mean(times["lazy"]):.1f}x')
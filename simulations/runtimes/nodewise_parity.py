@@ -0,0 +1,69 @@
+# Agreement of the NumPy mb and glasso (run_nodewise) with the R package huge
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR.parent.parent))
+sys.path.insert(0, str(BASE_DIR.parent))
+from data_cache import cached_block_graph
+from methods.run_huge import run_huge
+from methods.run_nodewise import run_nodewise
+
+#----------------------------------------------------------------
+# Settings
+#----------------------------------------------------------------
+random_seeds = [302, 303, 304]
+p = 250
+lambdas = list(np.geomspace(0.6, 0.1, 6))
+tolerance = 0.01 # largest accepted fraction of differing edges (relative to the union) per lambda
+n = 200
+
+#----------------------------------------------------------------
+# Run comparison
+#----------------------------------------------------------------
+# at fixed lambdas both solve the same problems, so the graphs should agree up to solver
+# tolerance; under RIC the rotations are drawn from different generators, so the selected
+# lambdas (and graphs) can differ slightly and are only reported
+def edges(adjacency):
+	coo = adjacency.csr.tocoo()
+	keep = coo.row < coo.col
+	return set(zip(coo.row[keep].tolist(), coo.col[keep].tolist()))
+
+def difference(A, B):
+	a, b = edges(A), edges(B)
+	return len(a ^ b), max(len(a | b), 1)
+
+worst = 0
+for random_seed in random_seeds:
+	data = cached_block_graph(n, 0.01, 10, [1, 4, p - 5], [0, 0, 2], np.ones(3), [4, 6], np.ones(2),
+		random_seed=random_seed)
+	X = np.array(data['X'])
+	print(f'seed {random_seed} (n = {n}, p = {p})')
+	print(f'--------------------------------')
+	for method in ['mb', 'glasso']:
+		R = run_huge(X, method=method, lambda_=lambdas)
+		for l in lambdas:
+			# scikit-learn's graphical lasso can fail on ill-conditioned problems that huge solves
+			try:
+				numpy = run_nodewise(X, method=method, lambda_=l)
+			except FloatingPointError:
+				print(f'{method}, lambda {l:.3f}: NumPy solver failed')
+				continue
+			n_diff, n_union = difference(R['adjacency_matrix'][l], numpy['adjacency_matrix'])
+			worst = max(worst, n_diff / n_union)
+			print(f'{method}, lambda {l:.3f}: {n_union} edges, {n_diff} differ ({100 * n_diff / n_union:.2f}%)')
+		R = run_huge(X, method=method, criterion='ric')
+		try:
+			numpy = run_nodewise(X, method=method, criterion='ric', random_state=random_seed)
+		except FloatingPointError:
+			print(f'{method}, RIC: NumPy solver failed')
+			continue
+		n_diff, n_union = difference(R['adjacency_matrix'], numpy['adjacency_matrix'])
+		print(f'{method}, RIC: {n_union} edges, {n_diff} differ ({100 * n_diff / n_union:.2f}%)')
+		print(f'{method} runtime: huge {R["runtime"]:.2f} s, numpy {numpy["runtime"]:.2f} s')
+	print()
+
+print(f'largest fixed-lambda difference: {100 * worst:.2f}% ({"within" if worst <= tolerance else "outside"} tolerance {100 * tolerance:.0f}%)')
@@ -11,9 +11,10 @@ from default_settings import default_settings
 
 import sys, os
 sys.path.insert(0, os.path.abspath('../..'))
+sys.path.insert(0, os.path.abspath('..'))
+from data_cache import cached_block_graph
 from methods import run_method
 from methods.metadata import method_type
-from simulations.simulate_block import block_graph
 
 ################################
 save_results = False
@@ -26,6 +27,9 @@ random_seed = 302
 p_list = [125, 250, 500, 1000, 2000, 4000, 8000]
 method = 'mmpc_local'
 
+# runs exceeding the budget are stopped and recorded; larger p are then skipped
+budget_seconds = 2 * 60 * 60
+
 m_type = method_type(method)
 
 # default or custom settings
@@ -46,14 +50,14 @@ for p in p_list:
 	print(f'\n{method} (p = {p})')
 	print(f'--------------------------------')
 
-	# simple block construction: 1 target + rest noise
+	# simple block construction: 1 target + rest noise; the bulk generator and Cholesky sampler keep set-up fast for large p
 	block_sizes = [1, p - 1]
 	block_degree = [0, 3]
 	connector_degree = [3]
 	block_magnitude = np.ones(len(block_sizes))
 	connector_magnitude = np.ones(len(block_sizes) - 1)
 
-	data = block_graph(
+	data = cached_block_graph(
 		n=n,
 		lmin=0.01,
 		lmax=10,
@@ -62,7 +66,9 @@ for p in p_list:
 		block_magnitude=block_magnitude,
 		connector_degree=connector_degree,
 		connector_magnitude=connector_magnitude,
-		random_seed=random_seed
+		random_seed=random_seed,
+		vectorized=True,
+		sampler='cholesky'
 	)
 
 	X = StandardScaler().fit_transform(data['X'])
@@ -71,17 +77,22 @@ for p in p_list:
 	if 'pfs' in method or m_type == 'bnlearn_local':
 		method_args['target_features'] = target_features
 
+	timed_out = False
 	if 'pfs' in method:
 		start = time.time()
 		result = pfs(X, **method_args)
 		runtime = time.time() - start
 	else:
-		result = run_method(method, X, **method_args)
-		runtime = result['runtime']
+		result = run_method(method, X, budget_seconds=budget_seconds, **method_args)
+		timed_out = result['timed_out']
+		runtime = budget_seconds if timed_out else result['runtime']
 
-	print(f'{method}: {runtime:.2f} seconds')
+	if timed_out:
+		print(f'{method}: timed out after {budget_seconds} seconds')
+	else:
+		print(f'{method}: {runtime:.2f} seconds')
 
-	results.append({'p':p, 'n':n, 'p_over_n':p / n, 'method':method, 'time_sec':runtime})
+	results.append({'p':p, 'n':n, 'p_over_n':p / n, 'method':method, 'time_sec':runtime, 'timed_out':timed_out})
 
 	#----------------------------------------------------------------
 	# Save results
@@ -91,5 +102,8 @@ for p in p_list:
 		df.to_csv(f'runtime_test_{method}_p{p}.csv', index=False)
 		print(f'\nSaved runtime_test_{method}_p{p}.csv')
 
+	if timed_out:
+		break
+
 
 		
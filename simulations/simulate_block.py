@@ -1,6 +1,9 @@
 # Generate graphical model data
 
 import numpy as np
+from scipy import sparse as sp
+from scipy.linalg import cholesky, solve_triangular
+from scipy.sparse.linalg import eigsh
 from sklearn.preprocessing import StandardScaler
 
 import warnings
@@ -10,47 +13,78 @@ warnings.filterwarnings('ignore', category=RuntimeWarning)
 # Generate data
 #--------------------------------
 def block_graph(n, lmin, lmax, block_sizes, block_degree, block_magnitude, 
-		connector_degree, connector_magnitude, sigma=0, random_seed=None):
+		connector_degree, connector_magnitude, sigma=0, random_seed=None, vectorized=False, sampler='mvn', rng=None):
+	# sampler='mvn' inverts Omega and calls np.random.multivariate_normal (reproduces the published data);
+	# sampler='cholesky' rescales Omega with Lanczos eigenvalues and samples through its Cholesky factor
+	# rng: numpy.random.Generator for all draws; if None, the global state is used (seeded with random_seed)
 
-	if random_seed is not None:
+	if random_seed is not None and rng is None:
 		np.random.seed(random_seed)
+	random = np.random if rng is None else rng
 
 	n_blocks = len(block_sizes)
 
-	Omega = generate_block_theta(block_sizes, block_degree, block_magnitude, connector_degree, connector_magnitude, sigma)
-	Omega = make_posdef(Omega, lmin, lmax)
+	use_cholesky = sampler == 'cholesky'
+	Omega = generate_block_theta(block_sizes, block_degree, block_magnitude, connector_degree, connector_magnitude, sigma,
+		vectorized=vectorized, sparse=use_cholesky and vectorized, rng=rng)
+	Omega = make_posdef(Omega, lmin, lmax, eigen_solver='lanczos' if use_cholesky else 'dense')
+	if sp.issparse(Omega):
+		Omega = Omega.toarray()
 	p = Omega.shape[0]
 
 	A = np.copy(Omega)
 	A[A != 0] = 1
 	np.fill_diagonal(A,0)
 
-	Sigma = np.linalg.inv(Omega)
-	X = np.random.multivariate_normal(np.zeros(p), Sigma, size=n)
+	if use_cholesky:
+		X = sample_precision(Omega, n, rng=rng)
+	else:
+		Sigma = np.linalg.inv(Omega)
+		X = random.multivariate_normal(np.zeros(p), Sigma, size=n)
 	X = StandardScaler().fit_transform(X)
 
-	# compute maximum correlation with response(s)
-	Sigma_hat = X.T @ X / n
-	abs_cor = np.abs(Sigma_hat)
-	np.fill_diagonal(abs_cor,0)
-	max_cor_response = []
-	for i in range(block_sizes[0]):
-		max_cor = np.max(abs_cor[i,:])
-		max_cor_response.append(max_cor)
-
 	target_features = np.arange(block_sizes[0])
 
+	# compute maximum correlation with response(s); only their rows of X.T @ X / n are needed
+	abs_cor = np.abs(X[:,target_features].T @ X / n)
+	abs_cor[target_features, target_features] = 0
+	max_cor_response = abs_cor.max(axis=1).tolist()
+
 	return {'X':X, 'A':A.astype(int), 'feature_names':None, 'target_features':target_features, 'max_cor_response':max_cor_response}
 
 #--------------------------------
 # Helpers
 #--------------------------------
 # generate precision matrix for the block design
-def generate_block_theta(block_sizes, block_degree, block_magnitude, connector_degree, connector_magnitude, sigma):
+def generate_block_theta(block_sizes, block_degree, block_magnitude, connector_degree, connector_magnitude, sigma,
+		vectorized=False, sparse=False, rng=None):
+	"""
+	Generate the (not yet positive definite) precision matrix of the block design.
+
+	Each upper-triangular entry of block i (diagonal included) is an edge with probability
+	block_degree[i] / block_sizes[i], and each entry between block i and block i+1 with
+	probability connector_degree[i] / max(block_sizes[i], block_sizes[i+1]). Edges get a
+	random sign and a N(magnitude, sigma^2) magnitude.
+
+	Parameters
+	--------------------------------
+	vectorized : bool
+		Draw the edges of each block and connector in bulk (see _bulk_entries). The entries
+		have the same distribution as in the default entry-by-entry loop, but the global numpy
+		random stream is consumed in a different order, so a seed gives a different matrix.
+	sparse : bool
+		Return a scipy.sparse CSR matrix instead of a dense array.
+	rng : numpy.random.Generator, optional
+		Source of all draws, in the same order as from the global state (default).
+	"""
 	n_blocks = len(block_sizes)
 	p = sum(block_sizes)
 	block_sparsity = [block_degree[i] / block_sizes[i] for i in range(n_blocks)]
 	connector_sparsity = [connector_degree[i] / max(block_sizes[i],block_sizes[i+1]) for i in range(n_blocks-1)]
+	if vectorized:
+		return _bulk_block_theta(block_sizes, block_sparsity, block_magnitude, connector_sparsity, connector_magnitude,
+			sigma, sparse, rng)
+	random = np.random if rng is None else rng
 	Omega = np.zeros((p, p))
 	start_idx = 0
 	# handle the block matrices
@@ -59,28 +93,97 @@ def generate_block_theta(block_sizes, block_degree, block_magnitude, connector_d
 		# fill block matrix
 		for row in range(start_idx, end_idx):
 			for col in range(row, end_idx):
-				if np.random.rand() <= block_sparsity[i]:
-					sign = np.random.choice([-1, 1])
-					Omega[row, col] = sign * np.random.normal(block_magnitude[i], sigma)
+				if random.random() <= block_sparsity[i]:
+					sign = random.choice([-1, 1])
+					Omega[row, col] = sign * random.normal(block_magnitude[i], sigma)
 		if i < n_blocks - 1:
 			# handle connector matrices between block i and block i+1
 			next_block_start = end_idx
 			next_block_end = next_block_start + block_sizes[i + 1]
 			for row in range(start_idx, end_idx):  # Rows of block i
 				for col in range(next_block_start, next_block_end):  # Columns of block i+1
-					if np.random.rand() <= connector_sparsity[i]:
-						sign = np.random.choice([-1, 1])
-						Omega[row, col] = sign * np.random.normal(connector_magnitude[i], sigma)
+					if random.random() <= connector_sparsity[i]:
+						sign = random.choice([-1, 1])
+						Omega[row, col] = sign * random.normal(connector_magnitude[i], sigma)
 		# move start index to the next block start
 		start_idx = end_idx
 	# symmetrize matrix
 	Omega = Omega + Omega.T - np.diag(np.diag(Omega))
+	return sp.csr_matrix(Omega) if sparse else Omega
+
+# vectorized generate_block_theta
+def _bulk_block_theta(block_sizes, block_sparsity, block_magnitude, connector_sparsity, connector_magnitude, sigma, sparse, rng):
+	p = sum(block_sizes)
+	starts = np.concatenate([[0], np.cumsum(block_sizes)])
+	rows, cols, values = [], [], []
+	for i in range(len(block_sizes)):
+		edges = [_bulk_entries(block_sizes[i], block_sizes[i], block_sparsity[i], block_magnitude[i], sigma, upper=True, rng=rng)]
+		offsets = [(starts[i], starts[i])]
+		if i < len(block_sizes) - 1:
+			edges.append(_bulk_entries(block_sizes[i], block_sizes[i + 1], connector_sparsity[i], connector_magnitude[i], sigma,
+				rng=rng))
+			offsets.append((starts[i], starts[i + 1]))
+		for (r, c, v), (row_offset, col_offset) in zip(edges, offsets):
+			rows.append(r + row_offset)
+			cols.append(c + col_offset)
+			values.append(v)
+	rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+	# symmetrize; diagonal entries appear once
+	off = rows != cols
+	rows, cols, values = np.concatenate([rows, cols[off]]), np.concatenate([cols, rows[off]]), np.concatenate([values, values[off]])
+	if sparse:
+		return sp.csr_matrix((values, (rows, cols)), shape=(p, p))
+	Omega = np.zeros((p, p))
+	Omega[rows, cols] = values
 	return Omega
 
+def _bulk_entries(n_rows, n_cols, prob, magnitude, sigma, upper=False, chunk_size=2**22, rng=None):
+	"""
+	Random edges of an n_rows x n_cols matrix (its upper triangle if upper is True).
+
+	RNG stream (from rng, or the global state if None): one uniform draw per candidate entry in
+	row-major order, taken in chunks of whole rows (the stream does not depend on chunk_size);
+	then, for the k entries with a draw <= prob, choice([-1, 1], size=k) signs and
+	normal(magnitude, sigma, size=k) magnitudes. Returns the row and column indices (row-major)
+	and values of the edges.
+	"""
+	random = np.random if rng is None else rng
+	# candidate entries per row
+	lengths = n_cols - np.arange(n_rows) if upper else np.full(n_rows, n_cols)
+	ends = np.cumsum(lengths)
+	rows, cols = [], []
+	row = 0
+	while row < n_rows:
+		# whole rows with at most chunk_size candidates (at least one row)
+		first = ends[row] - lengths[row]
+		stop = max(np.searchsorted(ends, first + chunk_size, side='right'), row + 1)
+		hits = np.flatnonzero(random.random(ends[stop - 1] - first) <= prob) + first
+		hit_rows = np.searchsorted(ends, hits, side='right')
+		hit_cols = hits - (ends[hit_rows] - lengths[hit_rows])
+		if upper:
+			hit_cols += hit_rows
+		rows.append(hit_rows)
+		cols.append(hit_cols)
+		row = stop
+	rows = np.concatenate(rows) if rows else np.zeros(0, dtype=int)
+	cols = np.concatenate(cols) if cols else np.zeros(0, dtype=int)
+	k = len(rows)
+	values = random.choice([-1, 1], size=k) * random.normal(magnitude, sigma, size=k)
+	return rows, cols, values
+
 # ensure precision matrix is positive definite
-def make_posdef(Omega, lmin, lmax):
+def make_posdef(Omega, lmin, lmax, eigen_solver='dense'):
 	p = Omega.shape[0]
 
+	# shifting by -lambda_min makes the largest eigenvalue lambda_max - lambda_min, so the two
+	# extreme eigenvalues of the input suffice; Lanczos finds them from sparse matrix products
+	if eigen_solver == 'lanczos':
+		lambda_min, lambda_max = extreme_eigenvalues(Omega)
+		I = sp.identity(p, format='csr') if sp.issparse(Omega) else np.eye(p)
+		scale = (lmax - lmin) / (lambda_max - lambda_min)
+		return (Omega - lambda_min * I) * scale + lmin * I
+
 	eigenvalues = np.linalg.eigvalsh(Omega)
 	lambda_min = np.min(eigenvalues)
 	Omega -= lambda_min * np.eye(p)
@@ -92,4 +195,20 @@ def make_posdef(Omega, lmin, lmax):
 	
 	return Omega
 
+# smallest and largest eigenvalue of a symmetric (sparse or dense) matrix
+def extreme_eigenvalues(Omega):
+	if Omega.shape[0] <= 2:
+		eigenvalues = np.linalg.eigvalsh(Omega.toarray() if sp.issparse(Omega) else Omega)
+		return eigenvalues[0], eigenvalues[-1]
+	# fixed starting vector, so the result does not depend on (or advance) the random state
+	v0 = np.ones(Omega.shape[0])
+	eigenvalues = eigsh(Omega, k=2, which='BE', v0=v0, return_eigenvectors=False)
+	return eigenvalues.min(), eigenvalues.max()
+
+# draw n samples from N(0, Omega^{-1}): with Omega = L L^T, x = L^{-T} z has covariance Omega^{-1}
+def sample_precision(Omega, n, rng=None):
+	L = cholesky(Omega, lower=True)
+	Z = (np.random if rng is None else rng).standard_normal((n, Omega.shape[0]))
+	return solve_triangular(L.T, Z.T, lower=False).T
+
 
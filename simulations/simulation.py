@@ -3,18 +3,18 @@
 import logging
 import pickle
 import sys
-import time
+from concurrent.futures import as_completed
 
-from localgraph import pfs, tp_and_fp
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 
 from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR.parent))
-from methods import run_method
-from simulate_block import block_graph
+from checkpoint import Checkpoint, normalize
+from methods import MethodPool
+from summary import RunningSummary
+from trials import generate_trial_data, run_trial_method, trial_streams
 
 #----------------------------------------------------------------
 # Global settings
@@ -31,6 +31,8 @@ file_name += '_dense' if do_dense else ''
 ################################
 default_settings = True
 ################################
+use_data_cache = True # load datasets from simulations/data_cache (see data_cache.py)
+################################
 
 # random seed list
 random_seed_list = np.arange(1,6)
@@ -80,33 +82,6 @@ simulation_metadata = {'n':n, 'p':p, 'snr':snr, 'block_sizes':block_sizes, 'bloc
 'random_seed_list':random_seed_list.tolist(), 'radii':radii, 'methods':methods, 'qpath_max':qpath_max, 'fdr_local':fdr_local,
 'fdr':fdr, 'ipss_selector':ipss_selector, 'do_nonlinear':do_nonlinear}
 
-# store results
-all_results = []
-
-# create nonlinear target if do_nonlinear is True
-def nonlinear_target(X, A_true, target, neighbors, snr):
-	signal = np.zeros(X.shape[0])
-	for i in neighbors:
-		signal += np.exp(-X[:,i]**2 / 2)
-		A_true[target,i] = A_true[i,target] = 1
-	sigma2 = np.var(signal) / snr
-	X[:,target] = signal + np.random.normal(0, np.sqrt(sigma2), size=n) 
-	# add edges between neighbors of target
-	for i in neighbors:
-		for j in neighbors:
-			if i < j:
-				A_true[i,j] = A_true[j,i] = 1
-	return X, A_true
-
-# convert dictionary of q-values to adjacency matrix
-def dict_to_matrix(graph_dict, p):
-	Q = graph_dict
-	A = np.zeros((p,p))
-	for (i,j), q in Q.items():
-		A[i,j] = q
-		A[j,i] = q
-	return A
-
 #----------------------------------------------------------------
 # Method configurations
 #----------------------------------------------------------------
@@ -114,8 +89,16 @@ lambda_ = None
 huge_crit = 'ric' # options: ebic, stars, ric
 bnlearn_test = 'mi-g' if do_nonlinear else 'cor'
 criterion = 'forward'
+local_backend = 'R' # 'numpy' learns the mmpc_local and si_hiton_pc_local neighborhoods in Python; the other local methods have no NumPy backend and use R
 ipss_args = {'selector':ipss_selector}
 verbose = False
+budget_seconds = None # wall-clock budget per comparison method run; timed-out runs are recorded as NaN
+n_workers = 1 # worker processes for (seed, method) tasks; 1 runs them in this process
+use_checkpoint = save_results # append finished tasks to <file_name>.jsonl and skip them on restart
+summary_every = 10 # print running means and 95% CI half-widths every this many finished tasks (0: never)
+stop_ci = None # stop early once every local TPR/FDP 95% CI half-width is at most this
+use_rng_streams = False # per-task generators from SeedSequence(seed).spawn; False reproduces the published global-seed results
+independent_tasks = False # start every task from the random state after data generation instead of continuing the stream from method to method; always on with n_workers > 1
 
 method_configs = {
 	# bnlearn (global)
@@ -135,13 +118,15 @@ method_configs = {
 	'iamb_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'verbose':verbose},
 	'iamb_fdr_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'verbose':verbose},
 	'inter_iamb_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'verbose':verbose},
-	'mmpc_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'verbose':verbose},
+	'mmpc_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'backend':local_backend, 'verbose':verbose},
 	'pc_stable_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'verbose':verbose},
-	'si_hiton_pc_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'verbose':verbose},
+	'si_hiton_pc_local':{'alpha':fdr, 'test':bnlearn_test, 'radius':max(radii), 'criterion':criterion, 'backend':local_backend, 'verbose':verbose},
 
 	# huge
 	'glasso':{'lambda_':lambda_, 'criterion':huge_crit},
 	'mb':{'lambda_':None, 'criterion':huge_crit},
+	'glasso_numpy':{'lambda_':lambda_, 'criterion':huge_crit},
+	'mb_numpy':{'lambda_':None, 'criterion':huge_crit},
 
 	# pfs
 	'pfs':{'method_args':ipss_args, 'qpath_max':qpath_max, 'max_radius':max(radii), 
@@ -156,143 +141,176 @@ method_configs = {
 }
 
 simulation_metadata['method_configs'] = method_configs
+simulation_metadata['budget_seconds'] = budget_seconds
+simulation_metadata['stop_ci'] = stop_ci
+simulation_metadata['use_rng_streams'] = use_rng_streams
+simulation_metadata['independent_tasks'] = independent_tasks or n_workers > 1
 
 #----------------------------------------------------------------
 # Run simulation
 #----------------------------------------------------------------
-if save_results:
-	logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(message)s')
-
-n_trials = len(random_seed_list)
+# settings of generate_trial_data
+data_settings = {'n':n, 'lmin':lmin, 'lmax':lmax, 'block_sizes':block_sizes, 'block_degree':block_degree,
+	'block_magnitude':block_magnitude, 'connector_degree':connector_degree, 'connector_magnitude':connector_magnitude,
+	'do_nonlinear':do_nonlinear, 'snr':snr, 'use_data_cache':use_data_cache}
+
+# config of one (seed, method) task
+def task_config(method_name, target_features):
+	config = dict(method_configs[method_name])
+	if method_name == 'pfs' or '_local' in method_name:
+		config['target_features'] = target_features
+	return config
+
+def log(message):
+	if save_results:
+		logging.info(message)
+	else:
+		print(message)
 
-print(f'Starting {file_name}')
-print(f'----------------------------------------------------------------')
+def report(random_seed, method_name, records):
+	time_sec = records[0]['time_sec']
+	if records[0]['timed_out']:
+		log(f'  seed {random_seed}, {method_name}: timed out after {time_sec:.2f} seconds')
+	else:
+		log(f'  seed {random_seed}, {method_name}: {time_sec:.2f} seconds')
 
-for trial, random_seed in enumerate(random_seed_list):
+# guard the driver: spawned workers import this script to unpickle tasks
+if __name__ == '__main__':
 
 	if save_results:
-		logging.info(f'trial {trial + 1}/{n_trials}')
+		logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(message)s')
+
+	n_trials = len(random_seed_list)
+	task_methods = [method_name for method_name in methods if method_name != 'truth']
+
+	print(f'Starting {file_name}')
+	print(f'----------------------------------------------------------------')
+
+	# records of each task, keyed by (trial, method index) so results can be put in sequential order
+	task_records = {}
+	pool = MethodPool(n_workers=n_workers, packages=()) if n_workers > 1 else None
+	futures = {}
+
+	checkpoint = Checkpoint(BASE_DIR / f'{file_name}.jsonl', radii) if use_checkpoint else None
+	if checkpoint is not None and len(checkpoint):
+		log(f'Resuming from {checkpoint.path} ({len(checkpoint)} records)')
+
+	# running local TPR/FDP per (method, radius), updated as tasks finish
+	summary = RunningSummary()
+	summary_path = BASE_DIR / f'{file_name}_summary.csv'
+
+	def finish(trial, i, records):
+		# checkpointed records are stored as they read back, so resumed and uninterrupted runs agree
+		if checkpoint is not None:
+			checkpoint.append(records)
+			records = [normalize(record) for record in records]
+		task_records[trial, i] = records
+		summary.update(records)
+		report(random_seed_list[trial], task_methods[i], records)
+		if summary_every and len(task_records) % summary_every == 0:
+			log(f'Running summary after {len(task_records)} tasks:\n{summary.snapshot().round(3).to_string(index=False)}')
+			if save_results:
+				summary.save(summary_path)
+
+	def converged():
+		if stop_ci is not None and summary.converged(stop_ci):
+			log(f'All 95% CI half-widths are at most {stop_ci}; stopping early')
+			return True
+		return False
+
+	try:
+		for trial, random_seed in enumerate(random_seed_list):
+
+			log(f'trial {trial + 1}/{n_trials}')
+
+			# skip tasks recorded by an earlier run
+			pending = []
+			for i, method_name in enumerate(task_methods):
+				if checkpoint is not None and checkpoint.done(random_seed, method_name):
+					task_records[trial, i] = checkpoint.records(random_seed, method_name)
+					summary.update(task_records[trial, i])
+				else:
+					pending.append(i)
+			if not pending:
+				continue
+
+			data_rng, task_seeds = trial_streams(random_seed, len(task_methods)) if use_rng_streams else (None, [None] * len(task_methods))
+
+			# generate data once per seed; every task of the seed receives it
+			data = generate_trial_data(random_seed, data_settings, rng=data_rng)
+
+			# without rng streams, sequential tasks continue the global stream in method order, as the
+			# published runs did; methods skipped on resume then shift the draws of later methods,
+			# which independent_tasks avoids
+			for i in pending:
+				method_name = task_methods[i]
+				args = (data, method_name, task_config(method_name, data['target_features']), radii, budget_seconds, random_seed,
+					task_seeds[i], simulation_metadata['independent_tasks'])
+				if pool is None:
+					finish(trial, i, run_trial_method(*args))
+				else:
+					futures[pool.submit(run_trial_method, *args)] = (trial, i)
+
+			if pool is None and converged():
+				break
+
+		# record tasks as they finish; stopping early cancels the tasks that have not started
+		for completed, future in enumerate(as_completed(futures)):
+			trial, i = futures[future]
+			finish(trial, i, future.result())
+			log(f'  {completed + 1}/{len(futures)} tasks done')
+			if converged():
+				break
+	finally:
+		if pool is not None:
+			pool.shutdown(cancel_futures=True)
+
+	all_results = [record for key in sorted(task_records) for record in task_records[key]]
+
+	#----------------------------------------------------------------
+	# Save or print results summary
+	#----------------------------------------------------------------
+	# convert to dataframe and save
+	if save_results:
+		summary.save(summary_path)
+		results_package = {
+			'metadata': simulation_metadata,
+			'results': all_results
+		}
+		with open(BASE_DIR / f"{file_name}.pkl", "wb") as f:
+			pickle.dump(results_package, f)
+			logging.info("Simulation results saved.")
 	else:
-		print(f'trial {trial + 1}/{n_trials}')
-
-	# generate data
-	data = block_graph(n, lmin, lmax, block_sizes, block_degree, block_magnitude, 
-		connector_degree, connector_magnitude, random_seed=random_seed)
-
-	# data output
-	X = data['X']
-	A_true = data['A']
-	target_features = data['target_features']
-	feature_names = data['feature_names']
-	max_cor_response = data['max_cor_response']
-
-	n_responses = len(target_features)
-	n, p = X.shape
-
-	# apply nonlinearity; note that in this study, the target feature is always 0
-	if do_nonlinear:
-		X, A_true = nonlinear_target(X, A_true, 0, np.arange(1, block_sizes[1]+1), snr)
-
-	X = StandardScaler().fit_transform(X)		
-
-	# add target_features to pfs and bnlearn_local args
-	method_configs['pfs']['target_features'] = target_features
-	for method_name in methods:
-		if '_local' in method_name:
-			method_configs[method_name]['target_features'] = target_features
-
-	for i, method_name in enumerate(methods):
-		if method_name == 'truth':
-			continue
-		else:
-			config = method_configs[method_name]
-			start = time.time()
-
-			if method_name == 'pfs':
-				Q = pfs(X, **config)
-				A = dict_to_matrix(Q,p)
-			else:
-				result = run_method(method_name, X, **config)
-				A = result['adjacency_matrix']
-
-			A = np.maximum(A, A.T)
-			method_time = time.time() - start
-
-			print(f'  {method_name}: {method_time:.2f} seconds')
-
-			# true positives in the full graph
-			n_true_global = np.sum(A_true) // 2
-			tp_global, fp_global = tp_and_fp(A, A_true, target_features, radius=None)
-			tpr_global = tp_global / max(n_true_global, 1)
-			fdp_global = fp_global / max(tp_global + fp_global, 1)
-
-			# loop over radii
-			for radius in radii:
-				# count true edges eligible under the tp_and_fp definition
-				tp_true, _ = tp_and_fp(A_true, A_true, target_features, radius=radius)
-				n_true_local = tp_true
-
-				tp_local, fp_local = tp_and_fp(A, A_true, target_features, radius=radius)
-				tpr_local = tp_local / max(n_true_local, 1)
-				fdp_local = fp_local / max(tp_local + fp_local, 1)
-
-				# save per radius
-				all_results.append({
-					'seed': random_seed,
-					'radius': radius,
-					'method': method_name,
-					'TPR_global': tpr_global,
-					'FDP_global': fdp_global,
-					'TPR_local': tpr_local,
-					'FDP_local': fdp_local,
-					'time_sec': method_time
-				})
-
-#----------------------------------------------------------------
-# Save or print results summary
-#----------------------------------------------------------------
-# convert to dataframe and save
-if save_results:
-	results_package = {
-		'metadata': simulation_metadata,
-		'results': all_results
-	}
-	with open(BASE_DIR / f"{file_name}.pkl", "wb") as f:
-		pickle.dump(results_package, f)
-		logging.info("Simulation results saved.")
-else:
-	df_results = pd.DataFrame(all_results)
-	radii = sorted(df_results['radius'].unique())
-	methods = df_results['method'].unique()
-
-	# Local TPR
-	tpr_local_table = pd.DataFrame(index=radii, columns=methods)
-	for r in radii:
-		df_r = df_results[df_results['radius'] == r]
-		for m in methods:
-			vals = df_r[df_r['method'] == m]['TPR_local']
-			mean = vals.mean()
-			std = vals.std()
-			tpr_local_table.loc[r, m] = f"{mean:.2f}"
-
-	print("\nLocal TPR")
-	print("----------------------------------------------------------------")
-	print(tpr_local_table.to_string())
-
-	# Local FDP
-	fdp_local_table = pd.DataFrame(index=radii, columns=methods)
-	for r in radii:
-		df_r = df_results[df_results['radius'] == r]
-		for m in methods:
-			vals = df_r[df_r['method'] == m]['FDP_local']
-			mean = vals.mean()
-			std = vals.std()
-			fdp_local_table.loc[r, m] = f"{mean:.2f}"
-
-	print("\nLocal FDP")
-	print("----------------------------------------------------------------")
-	print(fdp_local_table.to_string())
-
-print()
+		# the final tables use batch means of the records, as the analysis scripts do; running
+		# means can differ in the last bit and round differently, so they are only logged
+		df_results = pd.DataFrame(all_results)
+		radii = sorted(df_results['radius'].unique())
+		methods = [m for m in task_methods if m in set(df_results['method'])]
+
+		# Local TPR
+		tpr_local_table = pd.DataFrame(index=radii, columns=methods)
+		for r in radii:
+			df_r = df_results[df_results['radius'] == r]
+			for m in methods:
+				vals = df_r[df_r['method'] == m]['TPR_local']
+				tpr_local_table.loc[r, m] = f"{vals.mean():.2f}"
+
+		print("\nLocal TPR")
+		print("----------------------------------------------------------------")
+		print(tpr_local_table.to_string())
+
+		# Local FDP
+		fdp_local_table = pd.DataFrame(index=radii, columns=methods)
+		for r in radii:
+			df_r = df_results[df_results['radius'] == r]
+			for m in methods:
+				vals = df_r[df_r['method'] == m]['FDP_local']
+				fdp_local_table.loc[r, m] = f"{vals.mean():.2f}"
+
+		print("\nLocal FDP")
+		print("----------------------------------------------------------------")
+		print(fdp_local_table.to_string())
+
+	print()
 
 
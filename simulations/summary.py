@@ -0,0 +1,138 @@
+# Running summaries of simulation results
+"""
+The result tables used to be built after a run ended, by filtering the full results
+DataFrame once per (method, radius) cell. RunningSummary instead updates a running mean and
+variance (Welford's algorithm) per cell as each record arrives. A snapshot of the current
+means, standard deviations and confidence interval half-widths can be taken at any time,
+so long sweeps can be watched as they converge and stopped once the intervals are narrow
+enough. NaN values (timed-out runs) are skipped, as pandas does.
+
+Running means can differ from batch means in the last bit, which can flip the rounding of
+a printed value. Final tables (simulation.py, sweep.py and the analysis scripts) are
+therefore computed from the full records; RunningSummary is only used for live snapshots,
+the summary CSV and early stopping.
+
+Example:
+	summary = RunningSummary()
+	for records in finished_tasks:
+		summary.update(records)
+		if summary.converged(0.02):
+			break
+	print(summary.table('TPR_local'))
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+class RunningSummary:
+	"""
+	Running mean and variance of result metrics per group of records.
+
+	Parameters
+	--------------------------------
+	metrics : tuple of str
+		Record fields to summarize.
+	keys : tuple of str
+		Record fields identifying a group (a table cell).
+	z : float
+		Normal quantile of the confidence intervals (1.96 for 95%).
+	"""
+	def __init__(self, metrics=('TPR_local', 'FDP_local'), keys=('method', 'radius'), z=1.96):
+		self.metrics = tuple(metrics)
+		self.keys = tuple(keys)
+		self.z = z
+		# per group: rows count, mean and sum of squared deviations, one column per metric
+		self._stats = {}
+
+	def add(self, record):
+		key = tuple(_key(record[k]) for k in self.keys)
+		stats = self._stats.get(key)
+		if stats is None:
+			stats = self._stats[key] = np.zeros((3, len(self.metrics)))
+		x = np.array([record[m] for m in self.metrics], dtype=float)
+		seen = ~np.isnan(x)
+		x = np.where(seen, x, 0)
+		count = stats[0] + seen
+		delta = np.where(seen, x - stats[1], 0)
+		stats[1] += delta / np.maximum(count, 1)
+		stats[2] += delta * (x - stats[1])
+		stats[0] = count
+
+	def update(self, records):
+		for record in records:
+			self.add(record)
+
+	def __len__(self):
+		return len(self._stats)
+
+	def groups(self):
+		return list(self._stats)
+
+	def count(self, key, metric):
+		return int(self._stats[key][0, self.metrics.index(metric)]) if key in self._stats else 0
+
+	def mean(self, key, metric):
+		"""Mean of metric in a group (NaN if the group has no values)."""
+		if not self.count(key, metric):
+			return np.nan
+		return self._stats[key][1, self.metrics.index(metric)]
+
+	def std(self, key, metric):
+		"""Sample standard deviation (ddof=1, as in pandas; NaN with fewer than two values)."""
+		count = self.count(key, metric)
+		if count < 2:
+			return np.nan
+		return np.sqrt(self._stats[key][2, self.metrics.index(metric)] / (count - 1))
+
+	def half_width(self, key, metric):
+		"""Half-width of the normal confidence interval of the mean."""
+		return self.z * self.std(key, metric) / np.sqrt(max(self.count(key, metric), 1))
+
+	def snapshot(self):
+		"""
+		Current summary as a DataFrame with one row per group and mean, std, count and
+		ci (half-width) columns for every metric.
+		"""
+		rows = []
+		for key in self._stats:
+			row = dict(zip(self.keys, key))
+			for metric in self.metrics:
+				row[f'{metric}_mean'] = self.mean(key, metric)
+				row[f'{metric}_std'] = self.std(key, metric)
+				row[f'{metric}_count'] = self.count(key, metric)
+				row[f'{metric}_ci'] = self.half_width(key, metric)
+			rows.append(row)
+		columns = list(self.keys) + [f'{m}_{s}' for m in self.metrics for s in ('mean', 'std', 'count', 'ci')]
+		return pd.DataFrame(rows, columns=columns)
+
+	def table(self, metric, stat='mean', index='radius', columns='method'):
+		"""Current values of one statistic of metric, pivoted into a table (radius x method by default)."""
+		return self.snapshot().pivot_table(index=index, columns=columns, values=f'{metric}_{stat}', sort=False, dropna=False)
+
+	def converged(self, tol, metrics=None, min_count=2):
+		"""
+		True once every group has min_count values and confidence half-widths of at most tol.
+		Groups without any values (every run timed out) are ignored.
+		"""
+		checked = False
+		for key in self._stats:
+			for metric in metrics or self.metrics:
+				count = self.count(key, metric)
+				if count == 0:
+					continue
+				if count < min_count or self.half_width(key, metric) > tol:
+					return False
+				checked = True
+		return checked
+
+	def save(self, path):
+		"""Write the current snapshot to a CSV file, replacing it atomically."""
+		tmp = f'{path}.tmp'
+		self.snapshot().to_csv(tmp, index=False)
+		os.replace(tmp, path)
+
+# group keys are compared as Python values
+def _key(value):
+	return value.item() if isinstance(value, np.generic) else value
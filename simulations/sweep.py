@@ -0,0 +1,263 @@
+# Run a grid of simulation settings in one process
+"""
+simulation.py runs one combination of settings per process, chosen by editing do_dense,
+do_nonlinear, n and methods by hand, and every process regenerates its data and restarts R.
+This script takes a list of settings (keys of default_settings.py, optionally with
+overrides), seeds and methods, and expands them into (setting, seed, method) tasks.
+
+Shared stages are run once:
+- data generation and standardization, per distinct data settings and seed. Settings that
+  differ only in method parameters (fdr, radii, ...) share their data.
+- the data fingerprint, computed once in the driver and shipped with the data, so each
+  worker converts a dataset to R only once for all its methods.
+- R and the packages of the chosen methods, loaded once per worker of a persistent
+  MethodPool for the whole sweep.
+
+The method tasks are scheduled on the pool. The results are written as one table with a
+'setting' column, plus a checkpoint per setting (see checkpoint.py) for resuming.
+"""
+
+import logging
+import pickle
+import sys
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR.parent))
+from checkpoint import Checkpoint, normalize
+from data_cache import dataset_key
+from default_settings import default_settings
+from methods import DataContext, MethodPool
+from methods.local_learners import local_learners
+from methods.metadata import method_type
+from summary import RunningSummary
+from trials import generate_trial_data, run_trial_method, trial_streams
+
+#----------------------------------------------------------------
+# Sweep
+#----------------------------------------------------------------
+################################
+save_results = False
+################################
+sweep_name = 'sweep'
+################################
+
+# settings: names in default_settings, or (name, overrides) pairs
+settings_list = ['linear_sparse_n100', 'nonlinear_sparse_n100', 'linear_dense_n100']
+random_seed_list = np.arange(1, 6)
+methods = ['pfs', 'glasso_numpy', 'mb_numpy']
+
+# method options shared by all settings
+lambda_ = None
+huge_crit = 'ric'
+criterion = 'forward'
+local_backend = 'R'
+verbose = False
+budget_seconds = None
+use_data_cache = True
+n_workers = 1
+use_checkpoint = save_results
+summary_every = 20 # log running means and 95% CI half-widths every this many finished tasks (0: never)
+stop_ci = None # stop early once every local TPR/FDP 95% CI half-width is at most this
+use_rng_streams = True # per-task generators from SeedSequence(seed).spawn, independent of scheduling
+
+#----------------------------------------------------------------
+# Task graph
+#----------------------------------------------------------------
+# arguments of generate_trial_data
+data_fields = ('n', 'lmin', 'lmax', 'block_sizes', 'block_degree', 'block_magnitude', 'connector_degree',
+	'connector_magnitude', 'do_nonlinear', 'snr')
+
+# local methods with a NumPy learner (see methods/local_learners.py)
+numpy_local_methods = {name.replace('.', '_') + '_local' for name in local_learners}
+
+def resolve_settings(entry):
+	"""Settings dict of a settings_list entry."""
+	name, overrides = (entry, {}) if isinstance(entry, str) else entry
+	settings = {**default_settings[name], **overrides}
+	if overrides:
+		name += '_' + '_'.join(f'{key}{value}' for key, value in overrides.items())
+	return name, settings
+
+def method_configs(settings):
+	"""Method configurations of a setting, as in simulation.py."""
+	fdr = settings['fdr']
+	radius = max(settings['radii'])
+	test = 'mi-g' if settings['do_nonlinear'] else 'cor'
+	configs = {}
+	for method_name in methods:
+		m_type = method_type(method_name)
+		if method_name == 'pfs':
+			configs[method_name] = {'method_args':{'selector':settings['ipss_selector']}, 'qpath_max':settings['qpath_max'],
+				'max_radius':radius, 'fdr_local':settings['fdr_local'], 'criterion':criterion, 'verbose':verbose}
+		elif method_name == 'aracne':
+			configs[method_name] = {'mi':'mi-g'}
+		elif m_type == 'bnlearn':
+			configs[method_name] = {'alpha':fdr, 'test':test}
+		elif m_type == 'bnlearn_local':
+			# only mmpc and si.hiton.pc have a NumPy backend; the other local methods use R
+			backend = local_backend if method_name in numpy_local_methods else 'R'
+			configs[method_name] = {'alpha':fdr, 'test':test, 'radius':radius, 'criterion':criterion, 'backend':backend,
+				'verbose':verbose}
+		elif m_type == 'huge':
+			configs[method_name] = {'lambda_':lambda_ if method_name.startswith('glasso') else None, 'criterion':huge_crit}
+		elif m_type == 'silggm':
+			configs[method_name] = {'alpha':fdr}
+		else:
+			raise ValueError(f'No sweep configuration for {method_name}')
+	return configs
+
+def required_packages(methods):
+	"""R packages the methods of the sweep load; pfs and the NumPy methods run without R."""
+	packages = {'bnlearn': 'bnlearn', 'bnlearn_local': 'bnlearn', 'huge': 'huge', 'silggm': 'SILGGM'}
+	needed = set()
+	for method_name in methods:
+		if method_name.endswith('_numpy'):
+			continue
+		# local methods with a NumPy learner skip R only when the NumPy backend is chosen
+		if method_name in numpy_local_methods and local_backend == 'numpy':
+			continue
+		needed.add(packages.get(method_type(method_name)))
+	return tuple(sorted(needed - {None}))
+
+def expand(settings_list, random_seed_list, methods):
+	"""
+	Expand the sweep into data stages and method tasks.
+
+	Returns
+	--------------------------------
+	stages : dict
+		Maps (data key, seed) to the data settings of that stage, in first-use order.
+	tasks : list of tuple
+		(setting name, seed, method name, stage) for every task of the sweep.
+	"""
+	stages = {}
+	tasks = []
+	for entry in settings_list:
+		name, settings = resolve_settings(entry)
+		data_settings = {field: settings[field] for field in data_fields}
+		data_settings['use_data_cache'] = use_data_cache
+		key = dataset_key({field: settings[field] for field in data_fields})
+		for seed in random_seed_list:
+			stage = (key, int(seed))
+			stages.setdefault(stage, data_settings)
+			tasks.extend((name, int(seed), method_name, stage) for method_name in methods)
+	return stages, tasks
+
+def log(message):
+	if save_results:
+		logging.info(message)
+	else:
+		print(message)
+
+# guard the driver: spawned workers import this script to unpickle tasks
+if __name__ == '__main__':
+
+	if save_results:
+		logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(message)s')
+
+	settings = dict(resolve_settings(entry) for entry in settings_list)
+	configs = {name: method_configs(settings[name]) for name in settings}
+	stages, tasks = expand(settings_list, random_seed_list, methods)
+	log(f'{sweep_name}: {len(tasks)} tasks over {len(stages)} datasets')
+
+	checkpoints = {}
+	if use_checkpoint:
+		checkpoints = {name: Checkpoint(BASE_DIR / f'{sweep_name}_{name}.jsonl', settings[name]['radii']) for name in settings}
+
+	# records of each task, keyed by its position in tasks so the table follows the sweep order
+	task_records = {}
+	pool = MethodPool(n_workers=n_workers, packages=required_packages(methods)) if n_workers > 1 else None
+	futures = {}
+
+	# running local TPR/FDP per (setting, method, radius), updated as tasks finish
+	summary = RunningSummary(keys=('setting', 'method', 'radius'))
+	summary_path = BASE_DIR / f'{sweep_name}_summary.csv'
+
+	def finish(k, records):
+		name, seed, method_name, _ = tasks[k]
+		if name in checkpoints:
+			checkpoints[name].append(records)
+			records = [normalize(record) for record in records]
+		task_records[k] = [{'setting': name, **record} for record in records]
+		summary.update(task_records[k])
+		log(f'  {name}, seed {seed}, {method_name}: {records[0]["time_sec"]:.2f} seconds')
+		if summary_every and len(task_records) % summary_every == 0:
+			log(f'Running summary after {len(task_records)} tasks:\n{summary.snapshot().round(3).to_string(index=False)}')
+			if save_results:
+				summary.save(summary_path)
+
+	def converged():
+		if stop_ci is not None and summary.converged(stop_ci):
+			log(f'All 95% CI half-widths are at most {stop_ci}; stopping early')
+			return True
+		return False
+
+	try:
+		# tasks of each data stage, skipping those recorded by an earlier run
+		pending = {stage: [] for stage in stages}
+		for k, (name, seed, method_name, stage) in enumerate(tasks):
+			if name in checkpoints and checkpoints[name].done(seed, method_name):
+				task_records[k] = [{'setting': name, **record} for record in checkpoints[name].records(seed, method_name)]
+				summary.update(task_records[k])
+			else:
+				pending[stage].append(k)
+
+		for stage, data_settings in stages.items():
+			if not pending[stage]:
+				continue
+			data_rng, task_seeds = trial_streams(stage[1], len(methods)) if use_rng_streams else (None, [None] * len(methods))
+
+			# generate and standardize once; the context carries its fingerprint to the workers
+			data = generate_trial_data(stage[1], data_settings, rng=data_rng)
+			data['context'] = DataContext(data['X'], standardize=False)
+			key = data['context'].key
+			log(f'Dataset {key[:12]} (seed {stage[1]}): {len(pending[stage])} tasks')
+
+			for k in pending[stage]:
+				name, seed, method_name, _ = tasks[k]
+				config = dict(configs[name][method_name])
+				if method_name == 'pfs' or method_type(method_name) == 'bnlearn_local':
+					config['target_features'] = data['target_features']
+				args = (data, method_name, config, settings[name]['radii'], budget_seconds, seed, task_seeds[methods.index(method_name)],
+					pool is not None)
+				if pool is None:
+					finish(k, run_trial_method(*args))
+				else:
+					futures[pool.submit(run_trial_method, *args)] = k
+
+			if pool is None and converged():
+				break
+
+		for completed, future in enumerate(as_completed(futures)):
+			finish(futures[future], future.result())
+			log(f'  {completed + 1}/{len(futures)} tasks done')
+			if converged():
+				break
+	finally:
+		if pool is not None:
+			pool.shutdown(cancel_futures=True)
+
+	df_results = pd.DataFrame([record for k in sorted(task_records) for record in task_records[k]])
+
+	#----------------------------------------------------------------
+	# Save or print results
+	#----------------------------------------------------------------
+	if save_results:
+		summary.save(summary_path)
+		metadata = {'settings': settings, 'random_seed_list': random_seed_list.tolist(), 'methods': methods,
+			'method_configs': configs, 'budget_seconds': budget_seconds, 'stop_ci': stop_ci}
+		with open(BASE_DIR / f'{sweep_name}.pkl', 'wb') as f:
+			pickle.dump({'metadata': metadata, 'results': df_results}, f)
+		df_results.to_csv(BASE_DIR / f'{sweep_name}.csv', index=False)
+		logging.info('Sweep results saved.')
+	else:
+		# batch means of the records; the running summary is only used for the logged snapshots
+		means = df_results.groupby(['setting', 'method', 'radius'], sort=False)[['TPR_local', 'FDP_local']].mean()
+		print('\nLocal TPR and FDP (mean)')
+		print('----------------------------------------------------------------')
+		print(means.round(2).to_string())
@@ -0,0 +1,187 @@
+# Trial tasks for simulation.py
+"""
+simulation.py splits a sweep into (seed, method) tasks. The data of a seed are generated
+once, in the driver, and passed to all tasks of that seed. The tasks live in this module,
+not in the driver script, so that spawned worker processes can import them.
+
+By default the methods of a seed continue the global numpy random stream one after another,
+as the original sequential loop did, so the published results are reproduced. With
+restore_state, each task instead restores the random state that followed data generation
+before it runs its method. Methods that draw from np.random (such as pfs) then see the same
+stream whether the tasks run sequentially or in a pool, and in any order; simulation.py
+turns this on whenever tasks run in parallel.
+
+With use_rng_streams, the data and every task instead draw from their own
+numpy.random.Generator, derived from the seed with SeedSequence.spawn (see trial_streams).
+pfs only draws from the global state, so a task seeds it from its own stream first.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from localgraph import pfs
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from methods import DataContext, EdgeTable, SparseAdjacency, run_method
+from data_cache import cached_block_graph
+from simulate_block import block_graph
+from utils import LocalGraphEvaluator
+
+# create nonlinear target if do_nonlinear is True
+def nonlinear_target(X, A_true, target, neighbors, snr, rng=None):
+	signal = np.zeros(X.shape[0])
+	for i in neighbors:
+		signal += np.exp(-X[:,i]**2 / 2)
+		A_true[target,i] = A_true[i,target] = 1
+	sigma2 = np.var(signal) / snr
+	X[:,target] = signal + (np.random if rng is None else rng).normal(0, np.sqrt(sigma2), size=X.shape[0])
+	# add edges between neighbors of target
+	for i in neighbors:
+		for j in neighbors:
+			if i < j:
+				A_true[i,j] = A_true[j,i] = 1
+	return X, A_true
+
+def trial_streams(random_seed, n_tasks):
+	"""
+	Independent random streams for the data and the tasks of one trial.
+
+	SeedSequence(random_seed) is spawned into a data stream and a task stream. The task stream
+	is spawned again into one child per task, so a task's stream depends only on the seed and
+	its position in the method list, and not on scheduling or the number of workers. Tasks
+	get SeedSequences rather than generators, so a task that runs more than once (such as the
+	same method under two settings sharing their data) starts from the same state each time.
+
+	Returns
+	--------------------------------
+	data_rng : numpy.random.Generator
+	task_seeds : list of numpy.random.SeedSequence
+	"""
+	data_seq, task_seq = np.random.SeedSequence(random_seed).spawn(2)
+	return np.random.default_rng(data_seq), task_seq.spawn(n_tasks)
+
+def generate_trial_data(random_seed, settings, rng=None):
+	"""
+	Generate the data of one trial.
+
+	Parameters
+	--------------------------------
+	random_seed : int
+		Seed passed to block_graph.
+	settings : dict
+		Arguments of block_graph (n, lmin, lmax, block_sizes, block_degree, block_magnitude,
+		connector_degree, connector_magnitude) plus do_nonlinear, snr and optionally use_data_cache.
+	rng : numpy.random.Generator, optional
+		Source of all draws. If None, block_graph seeds the global state with random_seed.
+
+	Returns
+	--------------------------------
+	data : dict
+		Standardized X, true adjacency A_true, target_features, a LocalGraphEvaluator of A_true
+		shared by the methods of the trial (evaluator), and the global numpy random state after
+		generation (random_state).
+	"""
+	generate = cached_block_graph if settings.get('use_data_cache') else block_graph
+	data = generate(settings['n'], settings['lmin'], settings['lmax'], settings['block_sizes'],
+		settings['block_degree'], settings['block_magnitude'], settings['connector_degree'],
+		settings['connector_magnitude'], random_seed=random_seed, rng=rng)
+
+	X = data['X']
+	A_true = data['A']
+
+	# apply nonlinearity; note that in this study, the target feature is always 0
+	if settings['do_nonlinear']:
+		# cached arrays are read-only memory maps
+		X, A_true = np.array(X), np.array(A_true)
+		X, A_true = nonlinear_target(X, A_true, 0, np.arange(1, settings['block_sizes'][1] + 1), settings['snr'], rng=rng)
+
+	return {
+		'X': DataContext(X).X,
+		'A_true': A_true,
+		'target_features': data['target_features'],
+		'evaluator': LocalGraphEvaluator(A_true, data['target_features']),
+		'random_state': np.random.get_state()
+	}
+
+def run_trial_method(data, method_name, config, radii, budget_seconds=None, random_seed=None, rng=None,
+		restore_state=False):
+	"""
+	Run one method on the data of one trial and score it at every radius.
+
+	With rng (a SeedSequence from trial_streams, or a Generator), the method draws from a
+	generator built from it: NumPy backends receive it as random_state, and the global state
+	used by pfs is seeded from it. Otherwise, with restore_state, the global state after data
+	generation is restored first; without it, the method continues the current global stream.
+
+	Returns
+	--------------------------------
+	records : list of dict
+		One result row per radius, in the order of radii.
+	"""
+	if rng is None:
+		if restore_state:
+			np.random.set_state(data['random_state'])
+	else:
+		rng = np.random.default_rng(rng)
+		np.random.seed(rng.integers(2**32))
+		if method_name.endswith('_numpy'):
+			config = {**config, 'random_state': rng}
+	X = data['X']
+	p = X.shape[1]
+
+	start = time.time()
+	if method_name == 'pfs':
+		Q = pfs(X, **config)
+		A = EdgeTable.from_dict(Q, p).adjacency()
+	else:
+		# a shared context (see sweep.py) keeps its fingerprint, so R conversions are reused across tasks
+		context = data.get('context') or DataContext(X, standardize=False)
+		result = run_method(method_name, context, budget_seconds=budget_seconds, **config)
+		A = result['adjacency_matrix']
+	method_time = time.time() - start
+
+	# record timed-out runs as NaN, with the budget as their time (worker start-up and shutdown are not counted)
+	if A is None:
+		method_time = result['runtime']
+		return [{
+			'seed': random_seed,
+			'radius': radius,
+			'method': method_name,
+			'TPR_global': np.nan,
+			'FDP_global': np.nan,
+			'TPR_local': np.nan,
+			'FDP_local': np.nan,
+			'time_sec': method_time,
+			'timed_out': True
+		} for radius in radii]
+
+	# wrapper outputs are symmetric by construction and stay sparse
+	if not isinstance(A, SparseAdjacency):
+		A = np.maximum(A, A.T)
+
+	# true and false positives in the full graph and at every radius
+	counts = data['evaluator'].score(A, radii)
+	tp_global, fp_global = counts['tp_global'], counts['fp_global']
+	tpr_global = tp_global / max(counts['n_true_global'], 1)
+	fdp_global = fp_global / max(tp_global + fp_global, 1)
+
+	records = []
+	for k, radius in enumerate(radii):
+		tp_local, fp_local = int(counts['tp_local'][k]), int(counts['fp_local'][k])
+		tpr_local = tp_local / max(int(counts['n_true_local'][k]), 1)
+		fdp_local = fp_local / max(tp_local + fp_local, 1)
+
+		records.append({
+			'seed': random_seed,
+			'radius': radius,
+			'method': method_name,
+			'TPR_global': tpr_global,
+			'FDP_global': fdp_global,
+			'TPR_local': tpr_local,
+			'FDP_local': fdp_local,
+			'time_sec': method_time,
+			'timed_out': False
+		})
+	return records
@@ -1,6 +1,10 @@
 # Utility functions for localgraph-paper repository
 
 import numpy as np
+from scipy import sparse
+
+from methods.adjacency import SparseAdjacency
+from methods.data_context import DataContext
 
 def max_cor_response(X, target_features):
 	"""
@@ -8,8 +12,9 @@ def max_cor_response(X, target_features):
 
 	Parameters
 	--------------------------------
-	X : numpy.ndarray
+	X : numpy.ndarray or DataContext
 		Data matrix of shape (n, p), where n is the number of samples and p is the number of features.
+		A numpy array is assumed to be standardized; a DataContext reuses its cached correlation matrix.
 	target_features : list of int
 		Indices of the target features for which correlations are computed.
 
@@ -18,16 +23,238 @@ def max_cor_response(X, target_features):
 	max_cors : list of float
 		List of maximum absolute correlations, one value for each target feature in `target_features`.
 	"""
-	n = X.shape[0]
-	Sigma_hat = X.T @ X / n
-	abs_cor = np.abs(Sigma_hat)
-	np.fill_diagonal(abs_cor, 0)
-	max_cors = []
-	for i in target_features:
-		max_cor = np.max(abs_cor[i, :])
-		max_cors.append(max_cor)
-		
-	return max_cors
+	target_features = np.atleast_1d(target_features)
+	if isinstance(X, DataContext) and 'correlation' in X.__dict__:
+		abs_cor = np.abs(X.correlation[target_features])
+	else:
+		X = np.asarray(X)
+		n = X.shape[0]
+		# only the rows of the target features are needed
+		abs_cor = np.abs(X[:, target_features].T @ X / n)
+	abs_cor[np.arange(len(target_features)), target_features] = 0
+
+	return abs_cor.max(axis=1).tolist()
+
+
+	
+def restrict_to_local_graph(A, target_features, max_radius, return_matrix=False):
+	"""
+	Restrict a graph to the local graph of radius `max_radius` around the target features.
+
+	Same output as localgraph.restrict_to_local_graph, but the graph is traversed in sparse
+	form, so SparseAdjacency results and scipy sparse matrices are never densified.
+
+	Parameters
+	--------------------------------
+	A : numpy.ndarray, scipy.sparse matrix, or SparseAdjacency
+		Adjacency matrix of shape (p, p); nonzero entries are edges.
+	target_features : int or list of int
+		Indices of the target features.
+	max_radius : int
+		Radius of the local graph.
+	return_matrix : bool
+		If True, return A restricted to the local edges (same type as A) instead of an edge dict.
+
+	Returns
+	--------------------------------
+	Q : dict or matrix
+		Dict mapping both orientations (i, j) and (j, i) of every local edge to 1, or the restricted matrix.
+	"""
+	csr = _as_csr(A)
+	rows, cols = _local_edges(csr, target_features, max_radius)
+
+	if return_matrix:
+		rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+		if isinstance(A, SparseAdjacency):
+			return SparseAdjacency.from_edges(rows, cols, A.shape[0], symmetric=False)
+		if sparse.issparse(A):
+			values = np.asarray(sparse.csr_matrix(A)[rows, cols]).ravel()
+			return sparse.csr_matrix((values, (rows, cols)), shape=A.shape)
+		A_r = np.zeros_like(A)
+		A_r[rows, cols] = A[rows, cols]
+		return A_r
+
+	Q = dict.fromkeys(zip(rows.tolist(), cols.tolist()), 1)
+	Q.update(dict.fromkeys(zip(cols.tolist(), rows.tolist()), 1))
+	return Q
+
+def tp_and_fp(A, A_true, target_features, radius=None):
+	"""
+	Count true and false positive edges of an estimated graph, globally or in the local graph.
+
+	Same output as localgraph.tp_and_fp, computed on sparse edge lists.
+
+	Parameters
+	--------------------------------
+	A : numpy.ndarray, scipy.sparse matrix, SparseAdjacency, or dict
+		Estimated graph; a dict maps edges (i, j) to q-values.
+	A_true : numpy.ndarray, scipy.sparse matrix, or SparseAdjacency
+		True adjacency matrix of shape (p, p).
+	target_features : int or list of int
+		Indices of the target features.
+	radius : int, optional
+		Radius of the local graph. If None, all edges are counted.
+
+	Returns
+	--------------------------------
+	tp, fp : int
+		Numbers of true and false positive edges.
+	"""
+	p = A_true.shape[0]
+	if isinstance(A, dict):
+		A = _dict_to_csr(A, p)
+	A = _as_csr(A)
+	A_true = _as_csr(A_true)
+	if (A != A.T).nnz:
+		raise ValueError('A is not symmetric.')
+	if (A_true != A_true.T).nnz:
+		raise ValueError('A_true is not symmetric.')
+
+	if radius is None:
+		estimated = _edge_codes(*_upper_edges(A), p)
+		tp = int(np.isin(estimated, _edge_codes(*_upper_edges(A_true), p)).sum())
+		fp = estimated.size - tp
+	else:
+		true_local = _edge_codes(*_local_edges(A_true, target_features, radius), p)
+		estimated_local = _edge_codes(*_local_edges(A, target_features, radius), p)
+		tp = int(np.isin(estimated_local, true_local).sum())
+		fp = estimated_local.size - tp
+
+	return tp, fp
+
+class LocalGraphEvaluator:
+	"""
+	Score estimated graphs against one true graph at several radii at once.
+
+	Gives the same counts as tp_and_fp, but traverses the true graph only once. An edge (i, j)
+	belongs to the local graph of radius r exactly when min(d_i, d_j) < r, where d is the
+	shortest-path distance from the targets (the distances of adjacent nodes differ by at most
+	one). Every edge therefore has a level min(d_i, d_j) + 1, the smallest radius whose local
+	graph contains it. The levels of the true edges and the true edge counts are computed on
+	construction. score traverses an estimated graph once up to the largest radius and counts
+	all radii from the sorted levels.
+
+	Parameters
+	--------------------------------
+	A_true : numpy.ndarray, scipy.sparse matrix, or SparseAdjacency
+		True adjacency matrix of shape (p, p).
+	target_features : int or list of int
+		Indices of the target features.
+	"""
+	def __init__(self, A_true, target_features):
+		csr = _as_csr(A_true)
+		if (csr != csr.T).nnz:
+			raise ValueError('A_true is not symmetric.')
+		self.p = csr.shape[0]
+		self.target_features = target_features
+		rows, cols = _upper_edges(csr)
+		codes = _edge_codes(rows, cols, self.p)
+		levels = _edge_levels(csr, rows, cols, target_features, self.p)
+		order = np.argsort(codes)
+		self._codes = codes[order]
+		self._levels = levels[order]
+		self._sorted_levels = np.sort(levels)
+		self.n_true_global = codes.size
+
+	def n_true_local(self, radii):
+		"""Number of true edges in the local graph of each radius."""
+		return np.searchsorted(self._sorted_levels, radii, side='right')
+
+	def score(self, A, radii):
+		"""
+		Count true and false positives of A globally and at every radius.
+
+		Parameters
+		--------------------------------
+		A : numpy.ndarray, scipy.sparse matrix, SparseAdjacency, or dict
+			Estimated graph; a dict maps edges (i, j) to q-values.
+		radii : list of int
+			Radii of the local graphs.
+
+		Returns
+		--------------------------------
+		counts : dict
+			'tp_global', 'fp_global' and 'n_true_global', plus arrays 'tp_local', 'fp_local' and
+			'n_true_local' with one entry per radius.
+		"""
+		if isinstance(A, dict):
+			A = _dict_to_csr(A, self.p)
+		csr = _as_csr(A)
+		if (csr != csr.T).nnz:
+			raise ValueError('A is not symmetric.')
+		radii = np.asarray(radii)
+		rows, cols = _upper_edges(csr)
+		codes = _edge_codes(rows, cols, self.p)
+		levels = _edge_levels(csr, rows, cols, self.target_features, int(radii.max()))
+
+		# locate the estimated edges among the true edges
+		pos = np.minimum(np.searchsorted(self._codes, codes), max(self._codes.size - 1, 0))
+		is_true = self._codes[pos] == codes if self._codes.size else np.zeros(codes.size, dtype=bool)
+		# a true positive at radius r must be local in both graphs
+		tp_levels = np.sort(np.maximum(levels[is_true], self._levels[pos[is_true]]))
+
+		tp_local = np.searchsorted(tp_levels, radii, side='right')
+		tp_global = int(is_true.sum())
+		return {
+			'tp_global': tp_global,
+			'fp_global': codes.size - tp_global,
+			'n_true_global': self.n_true_global,
+			'tp_local': tp_local,
+			'fp_local': np.searchsorted(np.sort(levels), radii, side='right') - tp_local,
+			'n_true_local': self.n_true_local(radii)
+		}
+
+#--------------------------------
+# Sparse graph helpers
+#--------------------------------
+# binary CSR matrix without explicit zeros
+def _as_csr(A):
+	csr = A.csr if isinstance(A, SparseAdjacency) else sparse.csr_matrix(A)
+	csr = (csr != 0).astype(np.int8)
+	csr.sort_indices()
+	return csr
+
+def _dict_to_csr(Q, p):
+	if not Q:
+		return sparse.csr_matrix((p, p), dtype=np.int8)
+	edges = np.array(list(Q.keys()), dtype=np.int64)
+	values = np.array(list(Q.values()), dtype=float)
+	rows, cols = np.concatenate([edges[:,0], edges[:,1]]), np.concatenate([edges[:,1], edges[:,0]])
+	values = np.concatenate([values, values])
+	keep = values != 0
+	return sparse.csr_matrix((np.ones(keep.sum(), dtype=np.int8), (rows[keep], cols[keep])), shape=(p, p))
+
+def _upper_edges(csr):
+	coo = csr.tocoo()
+	keep = coo.row < coo.col
+	return coo.row[keep], coo.col[keep]
+
+# encode undirected edges (i < j) as single integers
+def _edge_codes(rows, cols, p):
+	return rows.astype(np.int64) * p + cols.astype(np.int64)
+
+# shortest-path distance from the targets, explored up to max_radius (inf beyond)
+def _local_distances(csr, target_features, max_radius):
+	dist = np.full(csr.shape[0], np.inf)
+	frontier = np.unique(np.atleast_1d(np.asarray(target_features, dtype=np.int64)))
+	dist[frontier] = 0
+	for d in range(1, max_radius + 1):
+		if frontier.size == 0:
+			break
+		reached = np.unique(csr[frontier].indices)
+		frontier = reached[np.isinf(dist[reached])]
+		dist[frontier] = d
+	return dist
 
+# upper-triangular edges of the local graph, excluding edges between two nodes at distance max_radius
+def _local_edges(csr, target_features, max_radius):
+	dist = _local_distances(csr, target_features, max_radius)
+	rows, cols = _upper_edges(csr)
+	d_rows, d_cols = dist[rows], dist[cols]
+	keep = np.isfinite(d_rows) & np.isfinite(d_cols) & ~((d_rows == max_radius) & (d_cols == max_radius))
+	return rows[keep], cols[keep]
 
-	
\ No newline at end of file
+# smallest radius whose local graph contains each edge (inf beyond max_radius)
+def _edge_levels(csr, rows, cols, target_features, max_radius):
+	dist = _local_distances(csr, target_features, max_radius)
+	return np.minimum(dist[rows], dist[cols]) + 1